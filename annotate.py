@@ -0,0 +1,188 @@
+'''Anotação em lote de partidas com avaliações do motor.
+
+Lê um arquivo de partidas (ver archive.py) em streaming, envia as posições a
+um pool de processos que executam a busca (engine.py) e escreve, na mesma
+ordem da entrada, uma linha JSON por partida com a avaliação de cada posição,
+o melhor lance, o lance jogado e a marcação de erro grave (blunder).
+
+As posições repetidas entre partidas (aberturas, por exemplo) são analisadas
+uma única vez: o processo principal mantém um cache, indexado pela chave da
+posição, compartilhado por todos os trabalhadores, e também reaproveita
+análises que ainda estão em andamento.
+
+Uso:
+    python annotate.py partidas.txt anotadas.jsonl --workers 8 --depth 3
+'''
+
+import argparse
+import json
+import sys
+from collections import OrderedDict, deque
+
+from archive import format_move, read_games, replay
+from batch import BatchStats, open_output, pool_size, worker_pool, worker_state
+from engine import Search
+from game import Game
+
+BLUNDER_THRESHOLD = 200  # centipeões perdidos pelo lance jogado
+CACHE_SIZE = 1_000_000
+WINDOW_PER_WORKER = 64  # posições em análise por processo antes de esperar a saída
+
+
+def _analyse(task):
+    # Cada processo mantém a sua busca (e tabela de transposição) entre posições
+    fen, depth = task
+    game = Game(fen)
+    score, best_move, _ = worker_state().search(game.board, game.current_turn, max_depth=depth)
+    return score, format_move(*best_move) if best_move else None
+
+
+class _LRUCache:
+    '''Cache limitado de análises, indexado pela chave da posição.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+class AnnotationStats(BatchStats):
+    '''Contadores de desempenho da anotação.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.games = 0
+        self.positions = 0
+        self.searched = 0
+
+    @property
+    def positions_per_second(self):
+        return self.rate(self.positions)
+
+    def __str__(self):
+        return (f"{self.games} partidas, {self.positions} posições "
+                f"({self.searched} analisadas, {self.positions - self.searched} do cache) "
+                f"em {self.elapsed:.1f}s: {self.positions_per_second:.1f} posições/s")
+
+
+def _game_positions(moves):
+    '''Reproduz a partida e devolve [(chave, fen)] das posições e os lances válidos.
+    '''
+    positions = []
+    for game in replay(moves):
+        positions.append((game.position_hash(), game.to_fen()))
+    return positions, moves[:len(positions) - 1]
+
+
+def _build_record(offset, moves, analyses, blunder_threshold):
+    '''Monta a anotação da partida. As pontuações do motor são do ponto de vista
+    de quem joga; na saída, 'eval' é dado do ponto de vista das brancas.
+    '''
+    annotated = []
+    for ply, move in enumerate(moves):
+        score, best = analyses[ply]
+        next_score, _ = analyses[ply + 1]
+        # O lance jogado vale -next_score para quem o jogou
+        loss = score + next_score
+        annotated.append({
+            'move': format_move(*move),
+            'eval': score if ply % 2 == 0 else -score,
+            'best': best,
+            'loss': loss,
+            'blunder': loss >= blunder_threshold,
+        })
+    final_score, _ = analyses[len(moves)]
+    return {
+        'offset': offset,
+        'moves': annotated,
+        'final_eval': final_score if len(moves) % 2 == 0 else -final_score,
+    }
+
+
+def annotate_games(games, workers=None, depth=3, blunder_threshold=BLUNDER_THRESHOLD,
+                   cache_size=CACHE_SIZE, stats=None):
+    '''Anota as partidas (iterável de (deslocamento, lances)), gerando um dict
+    por partida na ordem de entrada.
+    '''
+    stats = stats if stats is not None else AnnotationStats()
+    cache = _LRUCache(cache_size)
+    in_flight = {}
+    pending = deque()
+
+    with worker_pool(workers, Search) as pool:
+        window = pool_size(workers) * WINDOW_PER_WORKER
+
+        def emit_head():
+            offset, moves, keys, results = pending.popleft()
+            analyses = []
+            for key, result in zip(keys, results):
+                if not isinstance(result, tuple):
+                    result = result.get()
+                    cache.put(key, result)
+                    in_flight.pop(key, None)
+                analyses.append(result)
+            stats.games += 1
+            stats.positions += len(keys)
+            return _build_record(offset, moves, analyses, blunder_threshold)
+
+        for offset, moves in games:
+            positions, moves = _game_positions(moves)
+            keys = []
+            results = []
+            for key, fen in positions:
+                result = cache.get(key)
+                if result is None:
+                    result = in_flight.get(key)
+                if result is None:
+                    result = pool.apply_async(_analyse, ((fen, depth),))
+                    in_flight[key] = result
+                    stats.searched += 1
+                keys.append(key)
+                results.append(result)
+            pending.append((offset, moves, keys, results))
+
+            # A saída segue a ordem de entrada; esperamos a partida mais antiga
+            # apenas quando há posições suficientes em análise
+            while pending and (len(in_flight) >= window or _is_ready(pending[0][3])):
+                yield emit_head()
+
+        while pending:
+            yield emit_head()
+
+
+def _is_ready(results):
+    return all(isinstance(result, tuple) or result.ready() for result in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Anota partidas com avaliações do motor.")
+    parser.add_argument('archive')
+    parser.add_argument('output', help="Arquivo JSON Lines de saída ('-' para a saída padrão).")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--blunder', type=int, default=BLUNDER_THRESHOLD,
+                        help="Perda mínima, em centipeões, para marcar um erro grave.")
+    args = parser.parse_args(argv)
+
+    stats = AnnotationStats()
+    with open_output(args.output) as out:
+        for record in annotate_games(read_games(args.archive), workers=args.workers, depth=args.depth,
+                                     blunder_threshold=args.blunder, stats=stats):
+            out.write(json.dumps(record) + '\n')
+    print(stats, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+'''Leitura de arquivos de partidas e reprodução dos lances.
+
+Formato do arquivo: texto, uma partida por linha, com os lances em notação de
+coordenadas separados por espaço (ex.: "e2e4 e7e5 g1f3"). Linhas vazias ou
+iniciadas por '#' são ignoradas, assim como marcadores de resultado
+("1-0", "0-1", "1/2-1/2", "*"). Cada partida é identificada pelo deslocamento
+em bytes do início da sua linha, o que permite reabri-la diretamente.
+'''
+
+import os
+
+from game import Game
+
+FILES = 'abcdefgh'
+RESULT_TOKENS = {'1-0', '0-1', '1/2-1/2', '*'}
+
+
+def parse_square(name):
+    '''Converte uma casa em notação algébrica ("e2") para (linha, coluna).
+    '''
+    if len(name) != 2 or name[0] not in FILES or name[1] not in '12345678':
+        raise ValueError(f"Casa inválida: {name!r}")
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def square_name(row, col):
+    '''Converte (linha, coluna) para notação algébrica.
+    '''
+    return f"{FILES[col]}{8 - row}"
+
+
+def parse_move(text):
+    '''Converte um lance "e2e4" para a tupla (start_row, start_col, end_row, end_col).
+    '''
+    if len(text) != 4:
+        raise ValueError(f"Lance inválido: {text!r}")
+    return parse_square(text[:2]) + parse_square(text[2:])
+
+
+def format_move(start_row, start_col, end_row, end_col):
+    '''Converte uma tupla de lance para o texto "e2e4".
+    '''
+    return square_name(start_row, start_col) + square_name(end_row, end_col)
+
+
+def parse_game_line(line):
+    '''Extrai a lista de lances de uma linha do arquivo.
+    '''
+    return [parse_move(token) for token in line.split() if token not in RESULT_TOKENS]
+
+
+def split_archive(path, chunk_size):
+    '''Divide o arquivo em trechos (path, start, end) de cerca de chunk_size
+    bytes, para processamento em paralelo com read_games.
+    '''
+    size = os.path.getsize(path)
+    return [(path, start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+
+def read_games(path, start=0, end=None):
+    '''Percorre o arquivo em streaming, gerando (deslocamento, lances) para cada
+    partida cuja linha começa no intervalo [start, end).
+    '''
+    with open(path, 'rb') as f:
+        if start:
+            # Alinha no início da próxima linha completa
+            f.seek(start - 1)
+            f.readline()
+        while True:
+            offset = f.tell()
+            if end is not None and offset >= end:
+                break
+            raw = f.readline()
+            if not raw:
+                break
+            line = raw.decode('utf-8').strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                moves = parse_game_line(line)
+            except ValueError:
+                continue
+            yield offset, moves
+
+
+def read_game_at(path, offset):
+    '''Lê a partida que começa no deslocamento indicado.
+    '''
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return parse_game_line(f.readline().decode('utf-8'))
+
+
+def replay(moves):
+    '''Reproduz os lances em um novo Game, gerando o jogo após cada posição
+    (incluindo a inicial). A reprodução para no primeiro lance inválido.
+    '''
+    game = Game()
+    yield game
+    for move in moves:
+        if not game.make_move(*move):
+            return
+        yield game
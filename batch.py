@@ -0,0 +1,84 @@
+'''Estrutura comum das ferramentas em lote (position_index.py, annotate.py,
+tactics.py, render.py).
+
+As ferramentas usam um pool de processos em que cada trabalhador pode criar, ao
+iniciar, um objeto reaproveitado entre as tarefas (uma busca com a sua tabela de
+transposição, os desenhistas de diagramas...), contadores com o tempo decorrido
+e arquivos de entrada e saída em que '-' é a entrada ou a saída padrão.
+'''
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+_worker_state = None
+
+
+def _init_worker(factory, args):
+    global _worker_state
+    _worker_state = factory(*args)
+
+
+def worker_state():
+    '''Objeto criado por factory(*args) neste processo do pool (ver worker_pool).
+    '''
+    return _worker_state
+
+
+def worker_pool(workers=None, factory=None, args=()):
+    '''Pool de processos. Com 'factory', cada processo cria factory(*args) ao
+    iniciar e as tarefas o obtêm com worker_state(); 'factory' deve ser uma
+    classe ou função de nível de módulo.
+    '''
+    if factory is None:
+        return Pool(workers)
+    return Pool(workers, initializer=_init_worker, initargs=(factory, args))
+
+
+def pool_size(workers):
+    '''Número de processos de um pool criado com 'workers' (None = todos os núcleos).
+    '''
+    return workers or os.cpu_count() or 1
+
+
+class BatchStats:
+    '''Base dos contadores das ferramentas: guarda o início da execução.
+    '''
+    def __init__(self):
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def rate(self, count):
+        '''Itens por segundo desde o início.
+        '''
+        elapsed = self.elapsed
+        return count / elapsed if elapsed else 0.0
+
+
+@contextmanager
+def open_input(path):
+    '''Abre o arquivo de entrada para leitura ('-' = entrada padrão).
+    '''
+    if path == '-':
+        yield sys.stdin
+    else:
+        with open(path) as f:
+            yield f
+
+
+@contextmanager
+def open_output(path):
+    '''Abre o arquivo de saída para escrita ('-' = saída padrão, que não é
+    fechada, apenas esvaziada ao final).
+    '''
+    if path == '-':
+        yield sys.stdout
+        sys.stdout.flush()
+    else:
+        with open(path, 'w') as f:
+            yield f
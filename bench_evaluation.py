@@ -0,0 +1,114 @@
+'''Compara a avaliação incremental com o recálculo completo.
+
+A partir de cada posição de POSITIONS, percorre a árvore de lances até
+CHECK_DEPTH num único tabuleiro, fazendo e desfazendo os lances como a busca, e
+confere depois de cada make_search_move e de cada unmake_search_move que
+evaluate (parcelas mantidas por set_piece) é igual a evaluate_full (varredura
+do tabuleiro). Depois mede o tempo das duas nas posições e nas posições filhas,
+como nas folhas de uma busca.
+
+Uso:
+    python bench_evaluation.py [--repeat 200] [--depth 2]
+'''
+
+import argparse
+import time
+
+from engine import generate_moves, make_search_move, unmake_search_move
+from evaluation import PawnCache, evaluate, evaluate_full
+from game import Game
+
+CHECK_DEPTH = 2
+POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w - - 0 1",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2QK2R b - - 0 1",
+    "2r2rk1/1b2qppp/p3pn2/1p6/3P4/P1N1PB2/1P3PPP/2RQ1RK1 w - - 0 1",
+    "8/5pk1/6p1/3R4/8/6P1/5PK1/3r4 w - - 0 1",
+    "8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 1",
+]
+
+
+def leaf_fens():
+    '''FEN de cada posição de POSITIONS e de cada posição filha.
+    '''
+    for fen in POSITIONS:
+        game = Game(fen)
+        board, color = game.board, game.current_turn
+        yield game.to_fen()
+        for move in generate_moves(board, color):
+            captured = make_search_move(board, move)
+            game.current_turn = 'black' if color == 'white' else 'white'
+            yield game.to_fen()
+            game.current_turn = color
+            unmake_search_move(board, move, captured)
+
+
+def _check_position(board, color, pawn_cache, where):
+    if evaluate(board, color, pawn_cache) != evaluate_full(board, color):
+        raise AssertionError(f"Avaliação incremental diverge do recálculo completo {where}")
+
+
+def check_incremental(fen, depth, pawn_cache):
+    '''Percorre a árvore de lances a partir da posição num único tabuleiro e
+    confere a avaliação depois de cada lance feito e desfeito. Devolve o
+    número de posições conferidas.
+    '''
+    game = Game(fen)
+    board = game.board
+
+    def walk(color, depth, line):
+        checked = 0
+        enemy = 'black' if color == 'white' else 'white'
+        for move in generate_moves(board, color):
+            captured = make_search_move(board, move)
+            _check_position(board, enemy, pawn_cache, f"depois de {line + [move]} a partir de {fen}")
+            if depth > 1:
+                checked += walk(enemy, depth - 1, line + [move])
+            unmake_search_move(board, move, captured)
+            _check_position(board, color, pawn_cache, f"depois de desfazer {line + [move]} a partir de {fen}")
+            checked += 2
+        return checked
+
+    _check_position(board, game.current_turn, pawn_cache, f"em {fen}")
+    return 1 + walk(game.current_turn, depth, [])
+
+
+def _time(function, positions, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, color in positions:
+            function(board, color)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Avaliação incremental x recálculo completo.")
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=CHECK_DEPTH,
+                        help="Profundidade da árvore de lances conferida.")
+    args = parser.parse_args(argv)
+
+    check_cache = PawnCache()
+    checked = sum(check_incremental(fen, args.depth, check_cache) for fen in POSITIONS)
+    print(f"{checked} posições conferidas com make/unmake até profundidade {args.depth}")
+
+    positions = []
+    for fen in leaf_fens():
+        game = Game(fen)
+        positions.append((game.board, game.current_turn))
+
+    pawn_cache = PawnCache()
+    full = _time(evaluate_full, positions, args.repeat)
+    incremental = _time(lambda board, color: evaluate(board, color, pawn_cache), positions, args.repeat)
+    evaluations = len(positions) * args.repeat
+    print(f"{len(positions)} posições x {args.repeat} repetições")
+    print(f"recálculo completo: {evaluations / full:12.0f} avaliações/s")
+    print(f"incremental:        {evaluations / incremental:12.0f} avaliações/s")
+    print(f"ganho:              {full / incremental:12.1f}x")
+    print(f"cache de peões:     {pawn_cache.hit_rate:12.1%} de acertos")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+'''Suíte de benchmarks de desempenho com baselines gravados.
+
+Cada benchmark mede o tempo por operação em amostras curtas, cada uma dividida
+pelo tempo de uma carga de calibração medida logo antes e logo depois dela, e
+usa a mediana dessas razões, para que os números não dependam da velocidade
+momentânea da máquina. Os benchmarks de desenho dominados por cópias de
+superfícies usam uma calibração de cópias (blit), que acompanha a velocidade da
+memória melhor que a carga em Python puro. O resultado é comparado com o baseline gravado em
+BASELINE_PATH. A execução falha (código de saída 1) se alguma métrica ficar mais
+lenta que o baseline além da sua tolerância.
+
+O baseline (--update) é a mediana de várias execuções da suíte, cada uma num
+processo novo, e guarda para cada métrica uma tolerância a partir da variação
+observada entre elas (no mínimo --threshold). A tolerância não passa de
+MAX_TOLERANCE_FACTOR vezes --threshold: se o ruído for maior, --update falha em
+vez de gravar uma faixa larga demais. O baseline deve ser gravado na máquina
+onde a suíte roda.
+
+Os benchmarks de interface desenham numa superfície fora da tela com o driver
+de vídeo "dummy" do SDL, então rodam sem janela.
+
+Uso:
+    python benchmarks.py                  # executa e compara com o baseline
+    python benchmarks.py --update         # executa e grava um novo baseline
+    python benchmarks.py --only movegen   # apenas métricas cujo nome contém o texto
+'''
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from bench_evaluation import POSITIONS as EVALUATION_POSITIONS
+from engine import generate_moves
+from evaluation import evaluate, evaluate_full
+from game import Game
+from moves import MoveStack
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+DEFAULT_THRESHOLD = 0.25  # tolerância mínima de cada métrica
+MIN_TIME = 0.1  # duração mínima de cada amostra, em segundos
+REPEAT = 15  # amostras por métrica
+UPDATE_ROUNDS = 5  # execuções da suíte ao gravar o baseline
+NOISE_MARGIN = 2.0  # tolerância em múltiplos da variação entre execuções
+MAX_TOLERANCE_FACTOR = 2.0  # tolerância máxima em múltiplos de --threshold
+
+# Posições fixas para geração de lances e testes de ataque
+FEN_SET = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1",
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w - - 0 1",
+    "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2QK2R b - - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "4k3/8/8/8/8/8/8/4K2R w - - 0 1",
+]
+
+REPLAY_GAMES = 10
+REPLAY_PLIES = 40
+
+
+def _fixed_games():
+    '''Partidas determinísticas (lances legais sorteados com semente fixa),
+    devolvidas como listas de lances para Game.make_move.
+    '''
+    rng = random.Random(2024)
+    games = []
+    for _ in range(REPLAY_GAMES):
+        game = Game()
+        moves = []
+        for _ in range(REPLAY_PLIES):
+            legal = generate_moves(game.board, game.current_turn)
+            if not legal:
+                break
+            move = rng.choice(legal)
+            game.make_move(*move)
+            moves.append(move)
+        games.append(moves)
+    return games
+
+
+def _calibration_workload():
+    # Carga fixa em Python puro, usada para normalizar a velocidade da máquina
+    total = 0
+    board = [[None] * 8 for _ in range(8)]
+    for i in range(20000):
+        row, col = divmod(i & 63, 8)
+        if board[row][col] is None:
+            total += row * 8 + col
+    return total
+
+
+def _blit_calibration():
+    # Carga fixa de cópias de superfícies, para normalizar os benchmarks de desenho
+    import pygame
+
+    source = pygame.Surface((256, 256))
+    target = pygame.Surface((256, 256))
+
+    def workload():
+        for _ in range(50):
+            target.blit(source, (0, 0))
+    return workload
+
+
+def _loops_for(function, min_time):
+    # Quantas chamadas são precisas para a medição durar pelo menos min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
+
+
+def _timed(function, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - start) / number
+
+
+def _measure(function, operations, repeat, min_time=MIN_TIME, calibration=_calibration_workload):
+    '''Tempo por operação relativo à carga de calibração: mediana de 'repeat'
+    amostras, cada uma dividida pela média das calibrações medidas logo antes
+    e logo depois dela. A velocidade da máquina varia em questão de segundos,
+    então só amostras curtas e vizinhas são comparáveis.
+    '''
+    number = _loops_for(function, min_time)
+    calibration_number = _loops_for(calibration, min_time)
+    ratios = []
+    for _ in range(repeat):
+        before = _timed(calibration, calibration_number)
+        value = _timed(function, number) / operations
+        after = _timed(calibration, calibration_number)
+        ratios.append(value / ((before + after) / 2))
+    return statistics.median(ratios)
+
+
+def bench_movegen(repeat):
+    games = [Game(fen) for fen in FEN_SET]
+
+    def run():
+        for game in games:
+            generate_moves(game.board, game.current_turn)
+    return _measure(run, len(games), repeat)
+
+
+def bench_movegen_encoded(repeat):
+    games = [Game(fen) for fen in FEN_SET]
+    stack = MoveStack()
+
+    def run():
+        for game in games:
+            stack.generate(game.board, game.current_turn, 0)
+    return _measure(run, len(games), repeat)
+
+
+def bench_is_in_check(repeat):
+    boards = [Game(fen).board for fen in FEN_SET]
+    loops = 1000
+
+    def run():
+        for _ in range(loops):
+            for board in boards:
+                board.is_in_check('white')
+                board.is_in_check('black')
+    return _measure(run, loops * len(boards) * 2, repeat)
+
+
+def bench_is_square_attacked(repeat):
+    boards = [Game(fen).board for fen in FEN_SET]
+
+    def run():
+        for board in boards:
+            for row in range(8):
+                for col in range(8):
+                    board.is_square_attacked(row, col, 'white')
+                    board.is_square_attacked(row, col, 'black')
+    return _measure(run, len(boards) * 128, repeat)
+
+
+def bench_make_move(repeat):
+    games = _fixed_games()
+    plies = sum(len(moves) for moves in games)
+
+    def run():
+        for moves in games:
+            game = Game()
+            for move in moves:
+                game.make_move(*move)
+    return _measure(run, plies, repeat)
+
+
+def bench_game_replay(repeat):
+    # Reprodução completa: lances mais geração de lances em cada posição
+    games = _fixed_games()
+
+    def run():
+        for moves in games:
+            game = Game()
+            for move in moves:
+                generate_moves(game.board, game.current_turn)
+                game.make_move(*move)
+    return _measure(run, len(games), repeat)
+
+
+def bench_evaluate(repeat):
+    games = [Game(fen) for fen in EVALUATION_POSITIONS]
+    boards = [(game.board, game.current_turn) for game in games]
+    loops = 1000
+
+    def run():
+        for _ in range(loops):
+            for board, color in boards:
+                evaluate(board, color)
+    return _measure(run, loops * len(boards), repeat)
+
+
+def bench_evaluate_full(repeat):
+    games = [Game(fen) for fen in EVALUATION_POSITIONS]
+    boards = [(game.board, game.current_turn) for game in games]
+    loops = 50
+
+    def run():
+        for _ in range(loops):
+            for board, color in boards:
+                evaluate_full(board, color)
+    return _measure(run, loops * len(boards), repeat)
+
+
+def _headless_gui():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from gui import ChessGUI
+
+    gui = ChessGUI()
+    gui.game = Game(FEN_SET[3])
+    row, col = 6, 3
+    gui.selected_piece = gui.game.board.get_piece(row, col)
+    gui.selected_pos = (row, col)
+    gui.possible_moves = gui.selected_piece.get_possible_moves(gui.game.board)
+    return gui
+
+
+def _bench_gui_method(name, blit_calibration=True):
+    def bench(repeat):
+        gui = _headless_gui()
+        draw = getattr(gui, name)
+        frames = 100
+
+        def run():
+            for _ in range(frames):
+                draw()
+        calibration = _blit_calibration() if blit_calibration else _calibration_workload
+        return _measure(run, frames, repeat, calibration=calibration)
+    return bench
+
+
+def bench_render_diagram(repeat):
+    # Diagrama fora da tela, como em render.py (sem gravar o PNG)
+    _headless_gui()  # define o modo de vídeo exigido pelas imagens das peças
+    from render import DiagramRenderer
+
+    renderer = DiagramRenderer(256)
+    games = [Game(fen) for fen in FEN_SET]
+
+    def run():
+        for game in games:
+            renderer.render(game)
+    return _measure(run, len(games), repeat, calibration=_blit_calibration())
+
+
+BENCHMARKS = {
+    'movegen_fen': bench_movegen,
+    'movegen_encoded': bench_movegen_encoded,
+    'is_in_check': bench_is_in_check,
+    'is_square_attacked': bench_is_square_attacked,
+    'make_move': bench_make_move,
+    'game_replay': bench_game_replay,
+    'evaluate_incremental': bench_evaluate,
+    'evaluate_full': bench_evaluate_full,
+    'gui_draw_board': _bench_gui_method('draw_board'),
+    # draw_pieces gasta o tempo no laço em Python sobre as casas, não nas cópias
+    # das imagens das peças, então usa a calibração em Python puro
+    'gui_draw_pieces': _bench_gui_method('draw_pieces', blit_calibration=False),
+    'gui_draw_highlights': _bench_gui_method('draw_highlights'),
+    'render_diagram': bench_render_diagram,
+}
+
+
+def run_benchmarks(names, repeat):
+    '''Executa os benchmarks e devolve o tempo de cada métrica relativo à
+    calibração (independente da velocidade momentânea da máquina).
+    '''
+    return {name: BENCHMARKS[name](repeat) for name in names}
+
+
+def _run_in_subprocess(names, repeat):
+    # Cada rodada num processo novo, para que a variação entre processos
+    # (alocação de memória, sementes de hash) entre na faixa de ruído
+    command = [sys.executable, os.path.abspath(__file__), '--json', '--repeat', str(repeat), '--names', *names]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _max_tolerance(threshold):
+    return MAX_TOLERANCE_FACTOR * threshold
+
+
+def record_baseline(names, repeat, rounds, threshold):
+    '''Executa a suíte 'rounds' vezes, cada uma num processo novo, e devolve
+    (métricas, tolerâncias): a mediana de cada métrica e a sua faixa de ruído,
+    NOISE_MARGIN vezes a variação relativa observada entre as rodadas (no mínimo
+    'threshold'). Levanta ValueError se alguma faixa passar do limite
+    (ver _max_tolerance), pois uma tolerância assim não detectaria regressões.
+    '''
+    samples = {name: [] for name in names}
+    for _ in range(rounds):
+        for name, value in _run_in_subprocess(names, repeat).items():
+            samples[name].append(value)
+    metrics = {}
+    tolerances = {}
+    noisy = []
+    for name, values in samples.items():
+        median = statistics.median(values)
+        noise = NOISE_MARGIN * (max(values) - min(values)) / median
+        metrics[name] = median
+        tolerances[name] = round(max(threshold, noise), 3)
+        if noise > _max_tolerance(threshold):
+            noisy.append(f"{name} ({noise:.0%})")
+    if noisy:
+        raise ValueError(f"ruído acima do limite de {_max_tolerance(threshold):.0%}: {', '.join(noisy)}")
+    return metrics, tolerances
+
+
+def load_baseline(path):
+    '''Devolve (métricas, tolerâncias) do baseline gravado.
+    '''
+    if not os.path.exists(path):
+        return {}, {}
+    with open(path) as f:
+        data = json.load(f)
+    return data.get('metrics', {}), data.get('tolerances', {})
+
+
+def save_baseline(path, metrics, tolerances):
+    data = {
+        'metadata': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'unit': 'time per operation relative to the calibration workload (blit calibration for '
+                    'gui_draw_board, gui_draw_highlights and render_diagram)',
+        },
+        'metrics': metrics,
+        'tolerances': tolerances,
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(metrics, baseline, tolerances, threshold):
+    '''Devolve a lista de métricas que regrediram além da sua tolerância (a
+    faixa de ruído gravada no baseline, entre 'threshold' e _max_tolerance).
+    '''
+    regressions = []
+    for name, value in metrics.items():
+        reference = baseline.get(name)
+        if reference is None:
+            status = "novo"
+        else:
+            change = value / reference - 1
+            limit = min(max(threshold, tolerances.get(name, 0.0)), _max_tolerance(threshold))
+            status = f"{change:+.1%} (limite {limit:.0%})"
+            if change > limit:
+                status += "  REGRESSÃO"
+                regressions.append(name)
+        print(f"{name:24} {value:14.6f}  {status}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho com baselines gravados.")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update', action='store_true', help="Grava os resultados como novo baseline.")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Piora relativa tolerada antes de falhar (0.25 = 25%%).")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="Amostras por métrica.")
+    parser.add_argument('--rounds', type=int, default=UPDATE_ROUNDS,
+                        help="Execuções da suíte ao gravar o baseline.")
+    parser.add_argument('--only', help="Executa apenas as métricas cujo nome contém o texto.")
+    # Usados pelas rodadas de --update, executadas em processos separados
+    parser.add_argument('--json', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--names', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    names = args.names or [name for name in BENCHMARKS if not args.only or args.only in name]
+    if args.json:
+        print(json.dumps(run_benchmarks(names, args.repeat)))
+        return 0
+    baseline, tolerances = load_baseline(args.baseline)
+
+    if args.update:
+        try:
+            metrics, new_tolerances = record_baseline(names, args.repeat, args.rounds, args.threshold)
+        except ValueError as e:
+            print(f"Baseline não gravado: {e}")
+            return 1
+        compare(metrics, baseline, tolerances, args.threshold)
+        save_baseline(args.baseline, dict(baseline, **metrics), dict(tolerances, **new_tolerances))
+        print(f"Baseline gravado em {args.baseline}")
+        return 0
+
+    metrics = run_benchmarks(names, args.repeat)
+    regressions = compare(metrics, baseline, tolerances, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} métrica(s) regrediram além da tolerância: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,94 @@
-from pieces import Pawn, Rook, Knight, Bishop, Queen, King
+import random
+
+from pieces import PIECE_VALUES
+from evaluation import MG_TABLE, EG_TABLE, PHASE_WEIGHTS
+
+# Ordem fixa dos tipos de peça usada pelas chaves de posição e de material
+PIECE_KINDS = [(color, symbol) for color in ('white', 'black') for symbol in 'PNBRQK']
+PIECE_KIND_INDEX = {kind: i for i, kind in enumerate(PIECE_KINDS)}
+
+# Tabelas Zobrist geradas com semente fixa: as chaves precisam ser estáveis
+# entre processos e execuções, pois são gravadas em índices no disco.
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_PIECES = [[_zobrist_rng.getrandbits(64) for _ in range(64)] for _ in PIECE_KINDS]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+# Chave de material: 4 bits de contagem por tipo de peça (12 tipos -> 48 bits)
+MATERIAL_KEY_BITS = 4
+
+
+def material_key_from_string(signature):
+    '''Converte uma assinatura de material (ex.: "KRPkr", maiúsculas para as
+    brancas e minúsculas para as pretas) na chave usada por Board.material_key.
+    '''
+    key = 0
+    for char in signature:
+        if char.isspace():
+            continue
+        color = 'white' if char.isupper() else 'black'
+        kind = PIECE_KIND_INDEX.get((color, char.upper()))
+        if kind is None:
+            raise ValueError(f"Símbolo de peça inválido na assinatura: {char!r}")
+        key += 1 << (kind * MATERIAL_KEY_BITS)
+    return key
+
+
+# Tabelas de ataque pré-calculadas, indexadas pela casa (row * 8 + col)
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+# Direção oposta de cada direção em DIRECTIONS
+OPPOSITE_DIRECTION = [DIRECTIONS.index((-dr, -dc)) for dr, dc in DIRECTIONS]
+# Peças que deslizam ao longo de cada direção
+DIRECTION_SLIDERS = [('R', 'Q')] * 4 + [('B', 'Q')] * 4
+
+
+def _targets(square, offsets):
+    row, col = divmod(square, 8)
+    return [(row + dr) * 8 + col + dc for dr, dc in offsets
+            if 0 <= row + dr < 8 and 0 <= col + dc < 8]
+
+
+def _ray(square, direction):
+    row, col = divmod(square, 8)
+    dr, dc = direction
+    ray = []
+    row, col = row + dr, col + dc
+    while 0 <= row < 8 and 0 <= col < 8:
+        ray.append(row * 8 + col)
+        row, col = row + dr, col + dc
+    return ray
+
+
+KNIGHT_TARGETS = [_targets(sq, [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)])
+                  for sq in range(64)]
+KING_TARGETS = [_targets(sq, DIRECTIONS) for sq in range(64)]
+PAWN_TARGETS = {
+    'white': [_targets(sq, [(-1, -1), (-1, 1)]) for sq in range(64)],
+    'black': [_targets(sq, [(1, -1), (1, 1)]) for sq in range(64)],
+}
+RAYS = [[_ray(sq, direction) for direction in DIRECTIONS] for sq in range(64)]
+
 
 class Board:
     def __init__(self):
         self.board = self.create_board()
+        # Chaves mantidas de forma incremental por set_piece
+        self.zobrist_key = 0
+        self.material_key = 0
+        # Chave Zobrist só dos peões, para o cache de estrutura de peões
+        self.pawn_key = 0
+        # Parcelas da avaliação (material + PST, do ponto de vista das brancas)
+        # e fase da partida, também mantidas por set_piece (ver evaluation.py)
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+        # Mapas de ataque mantidos de forma incremental por set_piece:
+        # casas atacadas pela peça em cada casa e, por cor, quantas peças
+        # atacam cada casa (casas com peças da mesma cor contam como defendidas).
+        self.attacks_from = [[] for _ in range(64)]
+        self.attack_counts = {'white': [0] * 64, 'black': [0] * 64}
+        self.king_squares = {'white': None, 'black': None}
 
     def create_board(self):
         board = [[None for _ in range(8)] for _ in range(8)]
@@ -29,33 +115,180 @@ class Board:
 
     def set_piece(self, row, col, piece):
         if 0 <= row < 8 and 0 <= col < 8:
+            square = row * 8 + col
+            old_piece = self.board[row][col]
+
+            # Peças deslizantes cujo raio passa pela casa só mudam de ataque
+            # quando a ocupação da casa muda (ataques descobertos ou bloqueados).
+            if (old_piece is None) != (piece is None):
+                sliders = self._sliders_through(square)
+            else:
+                sliders = ()
+            for slider_square in sliders:
+                self._remove_attacks(slider_square)
+            if old_piece is not None:
+                self._remove_attacks(square)
+                if old_piece.symbol == 'K' and self.king_squares[old_piece.color] == (row, col):
+                    self.king_squares[old_piece.color] = None
+
+                piece_kind = (old_piece.color, old_piece.symbol)
+                kind = PIECE_KIND_INDEX[piece_kind]
+                self.zobrist_key ^= ZOBRIST_PIECES[kind][square]
+                self.material_key -= 1 << (kind * MATERIAL_KEY_BITS)
+                if old_piece.symbol == 'P':
+                    self.pawn_key ^= ZOBRIST_PIECES[kind][square]
+                self.mg_score -= MG_TABLE[piece_kind][square]
+                self.eg_score -= EG_TABLE[piece_kind][square]
+                self.phase -= PHASE_WEIGHTS[old_piece.symbol]
+            if piece is not None:
+                piece_kind = (piece.color, piece.symbol)
+                kind = PIECE_KIND_INDEX[piece_kind]
+                self.zobrist_key ^= ZOBRIST_PIECES[kind][square]
+                self.material_key += 1 << (kind * MATERIAL_KEY_BITS)
+                if piece.symbol == 'P':
+                    self.pawn_key ^= ZOBRIST_PIECES[kind][square]
+                self.mg_score += MG_TABLE[piece_kind][square]
+                self.eg_score += EG_TABLE[piece_kind][square]
+                self.phase += PHASE_WEIGHTS[piece.symbol]
             self.board[row][col] = piece
 
+            if piece is not None:
+                self._add_attacks(square, piece)
+                if piece.symbol == 'K':
+                    self.king_squares[piece.color] = (row, col)
+            for slider_square in sliders:
+                self._add_attacks(slider_square, self.board[slider_square >> 3][slider_square & 7])
+
+    def _sliders_through(self, square):
+        '''Casas das peças deslizantes cujo raio de ataque alcança a casa.
+        '''
+        board = self.board
+        sliders = []
+        for direction, ray in enumerate(RAYS[square]):
+            for target in ray:
+                piece = board[target >> 3][target & 7]
+                if piece is not None:
+                    # A peça encontrada ataca a casa na direção oposta
+                    if piece.symbol in DIRECTION_SLIDERS[OPPOSITE_DIRECTION[direction]]:
+                        sliders.append(target)
+                    break
+        return sliders
+
+    def _compute_attacks(self, square, piece):
+        symbol = piece.symbol
+        if symbol == 'N':
+            return KNIGHT_TARGETS[square]
+        if symbol == 'K':
+            return KING_TARGETS[square]
+        if symbol == 'P':
+            return PAWN_TARGETS[piece.color][square]
+        board = self.board
+        attacks = []
+        rays = RAYS[square]
+        directions = range(4) if symbol == 'R' else range(4, 8) if symbol == 'B' else range(8)
+        for direction in directions:
+            for target in rays[direction]:
+                attacks.append(target)
+                if board[target >> 3][target & 7] is not None:
+                    break
+        return attacks
+
+    def _add_attacks(self, square, piece):
+        attacks = self._compute_attacks(square, piece)
+        counts = self.attack_counts[piece.color]
+        for target in attacks:
+            counts[target] += 1
+        self.attacks_from[square] = attacks
+
+    def _remove_attacks(self, square):
+        piece = self.board[square >> 3][square & 7]
+        counts = self.attack_counts[piece.color]
+        for target in self.attacks_from[square]:
+            counts[target] -= 1
+        self.attacks_from[square] = []
+
     def find_king(self, color):
-        for r in range(8):
-            for c in range(8):
-                piece = self.board[r][c]
-                if isinstance(piece, King) and piece.color == color:
-                    return r, c
-        return None
+        # Posição mantida por set_piece
+        return self.king_squares[color]
 
     def is_square_attacked(self, row, col, attacking_color):
         # Verifica se a casa (row, col) está sendo atacada pela cor 'attacking_color'
-        for r_piece in range(8):
-            for c_piece in range(8):
-                piece = self.board[r_piece][c_piece]
-                if piece and piece.color == attacking_color:
-                    # Simula o movimento da peça para a casa (row, col)
-                    # e verifica se é um movimento válido para atacar aquela casa.
-                    # A verificação de xeque no próprio rei da peça atacante é ignorada aqui,
-                    # pois estamos apenas verificando se a casa pode ser atacada.
-                    # A lógica de is_valid_move da peça já considera bloqueios e capturas.
-                    try:
-                        if piece.is_valid_move(row, col, self, check_king_safety=False):
-                            return True
-                    except NotImplementedError:
-                        pass # Peças sem is_valid_move implementado ainda
-        return False
+        return self.attack_counts[attacking_color][row * 8 + col] > 0
+
+    def attack_count(self, row, col, attacking_color):
+        '''Quantas peças da cor 'attacking_color' atacam a casa (row, col).
+        '''
+        return self.attack_counts[attacking_color][row * 8 + col]
+
+    def is_hanging(self, row, col):
+        '''Verifica se a peça em (row, col) está atacada e sem defesa.
+        '''
+        piece = self.board[row][col]
+        if piece is None:
+            return False
+        enemy = 'black' if piece.color == 'white' else 'white'
+        square = row * 8 + col
+        return self.attack_counts[enemy][square] > 0 and self.attack_counts[piece.color][square] == 0
+
+    def _least_valuable_attacker(self, square, color, removed):
+        '''Casa da peça de menor valor da cor 'color' que ataca a casa,
+        ignorando as peças em 'removed' (raios atrás delas ficam descobertos).
+        '''
+        board = self.board
+        best_square, best_value = None, None
+        # Um peão da cor ataca a casa se estiver nas casas que um peão
+        # inimigo atacaria a partir dela
+        enemy = 'black' if color == 'white' else 'white'
+        for origin in PAWN_TARGETS[enemy][square]:
+            piece = board[origin >> 3][origin & 7]
+            if piece is not None and piece.color == color and piece.symbol == 'P' and origin not in removed:
+                return origin
+        for table, symbol in ((KNIGHT_TARGETS, 'N'), (KING_TARGETS, 'K')):
+            for origin in table[square]:
+                piece = board[origin >> 3][origin & 7]
+                if piece is not None and piece.color == color and piece.symbol == symbol \
+                        and origin not in removed:
+                    value = PIECE_VALUES[symbol]
+                    if best_value is None or value < best_value:
+                        best_square, best_value = origin, value
+        for direction, ray in enumerate(RAYS[square]):
+            sliders = DIRECTION_SLIDERS[direction]
+            for origin in ray:
+                if origin in removed:
+                    continue
+                piece = board[origin >> 3][origin & 7]
+                if piece is not None:
+                    if piece.color == color and piece.symbol in sliders:
+                        value = PIECE_VALUES[piece.symbol]
+                        if best_value is None or value < best_value:
+                            best_square, best_value = origin, value
+                    break
+        return best_square
+
+    def static_exchange(self, start_row, start_col, end_row, end_col):
+        '''Avaliação estática de troca (SEE): saldo material, do ponto de vista
+        de quem joga, da sequência de capturas na casa de destino começando pelo
+        lance indicado, com cada lado recapturando com a peça de menor valor.
+        '''
+        piece = self.board[start_row][start_col]
+        target = self.board[end_row][end_col]
+        square = end_row * 8 + end_col
+        gains = [PIECE_VALUES[target.symbol] if target else 0]
+        removed = {start_row * 8 + start_col}
+        on_square = PIECE_VALUES[piece.symbol]
+        color = 'black' if piece.color == 'white' else 'white'
+        while True:
+            origin = self._least_valuable_attacker(square, color, removed)
+            if origin is None:
+                break
+            gains.append(on_square - gains[-1])
+            on_square = PIECE_VALUES[self.board[origin >> 3][origin & 7].symbol]
+            removed.add(origin)
+            color = 'black' if color == 'white' else 'white'
+        # Cada lado pode parar de capturar quando a troca deixa de compensar
+        for i in range(len(gains) - 1, 0, -1):
+            gains[i - 1] = -max(-gains[i - 1], gains[i])
+        return gains[0]
 
     def is_in_check(self, color):
         king_pos = self.find_king(color)
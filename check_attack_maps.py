@@ -0,0 +1,111 @@
+'''Confere os mapas de ataque incrementais do tabuleiro com um recálculo completo.
+
+Board mantém attacks_from, attack_counts e king_squares de forma incremental em
+set_piece, recalculando só as peças de longo alcance cujos raios passam pela
+casa alterada. Este script joga partidas aleatórias (com semente fixa) e, em
+cada posição e depois de fazer e desfazer cada lance legal (como na busca),
+compara esses mapas com os obtidos por _compute_attacks em todas as casas.
+
+Uso:
+    python check_attack_maps.py [--games 30] [--plies 60] [--seed 2024]
+'''
+
+import argparse
+import random
+import sys
+
+from engine import generate_moves, make_search_move, unmake_search_move
+from game import Game
+
+
+def recompute_attack_maps(board):
+    '''Devolve (attacks_from, attack_counts, king_squares) calculados do zero.
+    '''
+    attacks_from = [[] for _ in range(64)]
+    attack_counts = {'white': [0] * 64, 'black': [0] * 64}
+    king_squares = {'white': None, 'black': None}
+    for square in range(64):
+        piece = board.board[square >> 3][square & 7]
+        if piece is None:
+            continue
+        attacks = board._compute_attacks(square, piece)
+        attacks_from[square] = attacks
+        counts = attack_counts[piece.color]
+        for target in attacks:
+            counts[target] += 1
+        if piece.symbol == 'K':
+            king_squares[piece.color] = (square >> 3, square & 7)
+    return attacks_from, attack_counts, king_squares
+
+
+def attack_map_errors(board):
+    '''Lista de divergências entre os mapas incrementais e o recálculo.
+    '''
+    attacks_from, attack_counts, king_squares = recompute_attack_maps(board)
+    errors = []
+    for square in range(64):
+        if sorted(board.attacks_from[square]) != sorted(attacks_from[square]):
+            errors.append(f"attacks_from[{square}]: {sorted(board.attacks_from[square])} != "
+                          f"{sorted(attacks_from[square])}")
+    for color in ('white', 'black'):
+        if board.attack_counts[color] != attack_counts[color]:
+            squares = [square for square in range(64)
+                       if board.attack_counts[color][square] != attack_counts[color][square]]
+            errors.append(f"attack_counts[{color}] diverge nas casas {squares}")
+        if board.king_squares[color] != king_squares[color]:
+            errors.append(f"king_squares[{color}]: {board.king_squares[color]} != {king_squares[color]}")
+    return errors
+
+
+def check_game(rng, plies):
+    '''Joga uma partida aleatória conferindo os mapas; devolve (posições
+    conferidas, primeira divergência ou None).
+    '''
+    game = Game()
+    board = game.board
+    checked = 0
+    for _ in range(plies):
+        color = game.current_turn
+        moves = generate_moves(board, color)
+        for move in moves:
+            captured = make_search_move(board, move)
+            errors = attack_map_errors(board)
+            unmake_search_move(board, move, captured)
+            errors = errors or attack_map_errors(board)
+            checked += 2
+            if errors:
+                return checked, (game.to_fen(), move, errors)
+        if not moves:
+            break
+        game.make_move(*rng.choice(moves))
+        checked += 1
+        errors = attack_map_errors(board)
+        if errors:
+            return checked, (game.to_fen(), None, errors)
+    return checked, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Confere os mapas de ataque incrementais.")
+    parser.add_argument('--games', type=int, default=30)
+    parser.add_argument('--plies', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    total = 0
+    for index in range(args.games):
+        checked, failure = check_game(rng, args.plies)
+        total += checked
+        if failure is not None:
+            fen, move, errors = failure
+            print(f"Partida {index}: mapas divergem em {fen} (lance {move}):")
+            for error in errors:
+                print(f"  {error}")
+            return 1
+    print(f"{args.games} partidas, {total} posições conferidas sem divergências")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
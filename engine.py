@@ -0,0 +1,356 @@
+'''Busca alfa-beta com aprofundamento iterativo e tabela de transposição.
+
+Internamente os lances usam a codificação de 16 bits de moves.py, em listas
+pré-alocadas por profundidade (MoveStack); a interface pública (Search.search,
+generate_moves) usa tuplas (start_row, start_col, end_row, end_col), como em
+Game.make_move. A busca trabalha diretamente sobre o Board, fazendo e
+desfazendo os lances com set_piece, e o deixa como estava ao terminar.
+'''
+
+import threading
+import time
+from array import array
+
+from board import ZOBRIST_BLACK_TO_MOVE
+from evaluation import PawnCache, evaluate
+from moves import MoveStack, decode_tuple, encode_tuple, make_encoded_move, unmake_encoded_move
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+
+# Tipos de entrada na tabela de transposição
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+TT_SIZE = 1_000_000
+CHECK_TIME_EVERY = 1024
+
+
+class SearchStopped(Exception):
+    '''Interrompe a busca quando o tempo acaba ou a parada é solicitada.
+    '''
+
+
+def other_color(color):
+    return 'black' if color == 'white' else 'white'
+
+
+def position_key(board, color):
+    '''Chave da posição para a tabela de transposição (inclui o lado a jogar).
+    '''
+    return board.zobrist_key ^ ZOBRIST_BLACK_TO_MOVE if color == 'black' else board.zobrist_key
+
+
+def generate_moves(board, color):
+    '''Lista os lances legais da cor indicada.
+    '''
+    moves = []
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece is not None and piece.color == color:
+                moves.extend((row, col, end_row, end_col)
+                             for end_row, end_col in piece.get_possible_moves(board))
+    return moves
+
+
+def make_search_move(board, move):
+    '''Faz o lance (tupla) no tabuleiro e devolve a peça capturada (para
+    desfazer). Versão com tuplas de moves.make_encoded_move.
+    '''
+    return make_encoded_move(board, encode_tuple(*move))
+
+
+def unmake_search_move(board, move, captured):
+    unmake_encoded_move(board, encode_tuple(*move), captured)
+
+
+def _score_to_tt(score, ply):
+    # Pontuações de mate são guardadas relativas ao nó, não à raiz
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class TranspositionTable:
+    '''Tabela de transposição de tamanho fixo, indexada pela chave Zobrist da
+    posição. Cada entrada é (profundidade, pontuação, tipo, lance codificado).
+
+    Substituição por profundidade com envelhecimento: uma entrada só é trocada
+    por outra de profundidade menor se for de uma busca anterior (new_search),
+    então a tabela nunca deixa de aceitar posições novas ao encher.
+    '''
+    def __init__(self, size=TT_SIZE):
+        # Tamanho arredondado para potência de 2, para indexar com uma máscara
+        size = 1 << max(size - 1, 0).bit_length()
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size
+        self.ages = [0] * size
+        self.age = 0
+
+    def new_search(self):
+        self.age += 1
+
+    def probe(self, key):
+        index = key & self.mask
+        if self.keys[index] == key:
+            return self.entries[index]
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = key & self.mask
+        entry = self.entries[index]
+        if (entry is not None and self.keys[index] != key and self.ages[index] == self.age
+                and entry[0] > depth):
+            return
+        self.keys[index] = key
+        self.entries[index] = (depth, score, flag, move)
+        self.ages[index] = self.age
+
+    def __len__(self):
+        return len(self.keys) - self.keys.count(None)
+
+    def clear(self):
+        self.keys = [None] * len(self.keys)
+        self.entries = [None] * len(self.entries)
+        self.ages = [0] * len(self.ages)
+        self.age = 0
+
+
+class Search:
+    '''Busca negamax com poda alfa-beta. A tabela de transposição pode ser
+    compartilhada entre buscas (e reaproveitada entre lances).
+    '''
+    def __init__(self, tt=None, tt_size=TT_SIZE):
+        self.tt = tt if tt is not None else TranspositionTable(tt_size)
+        self.pawn_cache = PawnCache()
+        self.move_stack = MoveStack()
+        self.nodes = 0
+        self.deadline = None
+        self.stop_event = None
+        self.root_move = None  # melhor lance da raiz na última iteração completa
+
+    def search(self, board, color, max_depth=3, time_limit=None, stop_event=None):
+        '''Aprofundamento iterativo até max_depth ou até o tempo acabar.
+        Devolve (pontuação do ponto de vista de 'color', melhor lance, profundidade
+        completada). O melhor lance é None se não houver lances legais.
+        '''
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.stop_event = stop_event
+        self.tt.new_search()
+        best = (0, None, 0)
+        for depth in range(1, max_depth + 1):
+            try:
+                score = self._negamax(board, color, depth, -MATE_SCORE, MATE_SCORE, 0)
+            except SearchStopped:
+                break
+            best = (score, decode_tuple(self.root_move) if self.root_move is not None else None, depth)
+            if abs(score) >= MATE_THRESHOLD:
+                break
+        return best
+
+    def search_root_moves(self, board, color, depth):
+        '''Pontuação exata de cada lance da raiz com a profundidade indicada.
+        Devolve [(pontuação, lance)] em ordem decrescente de pontuação.
+        '''
+        self.nodes = 0
+        self.deadline = None
+        self.stop_event = None
+        self.tt.new_search()
+        start, end = self.move_stack.generate(board, color, 0)
+        root_moves = self.move_stack.buffer[start:end]
+        enemy = other_color(color)
+        results = []
+        for move in root_moves:
+            captured = make_encoded_move(board, move)
+            try:
+                score = -self._negamax(board, enemy, depth - 1, -MATE_SCORE, MATE_SCORE, 1)
+            finally:
+                unmake_encoded_move(board, move, captured)
+            results.append((score, decode_tuple(move)))
+        results.sort(key=lambda result: -result[0])
+        return results
+
+    def principal_variation(self, board, color, max_length):
+        '''Sequência de melhores lances guardada na tabela de transposição a
+        partir da posição, com no máximo max_length lances.
+        '''
+        line = []
+        made = []
+        try:
+            while len(line) < max_length:
+                entry = self.tt.probe(position_key(board, color))
+                if entry is None or entry[3] is None:
+                    break
+                move = entry[3]
+                start, end = self.move_stack.generate(board, color, len(line))
+                if move not in self.move_stack.buffer[start:end]:
+                    break
+                made.append((move, make_encoded_move(board, move)))
+                line.append(decode_tuple(move))
+                color = other_color(color)
+        finally:
+            for move, captured in reversed(made):
+                unmake_encoded_move(board, move, captured)
+        return line
+
+    def _check_stop(self):
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchStopped
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchStopped
+
+    def _order_moves(self, board, buffer, start, end, tt_move):
+        '''Ordena o trecho do buffer no próprio lugar: lance da tabela de
+        transposição primeiro, depois as capturas pela avaliação estática de
+        troca, depois os demais lances na ordem de geração.
+        '''
+        first = start
+        if tt_move is not None:
+            for i in range(start, end):
+                if buffer[i] == tt_move:
+                    buffer[i], buffer[first] = buffer[first], tt_move
+                    first += 1
+                    break
+        rows = board.board
+        captures_end = first
+        for i in range(first, end):
+            target = (buffer[i] >> 6) & 63
+            if rows[target >> 3][target & 7] is not None:
+                buffer[i], buffer[captures_end] = buffer[captures_end], buffer[i]
+                captures_end += 1
+        if captures_end - first > 1:
+            buffer[first:captures_end] = array('H', sorted(buffer[first:captures_end],
+                key=lambda move: -board.static_exchange(*decode_tuple(move))))
+
+    def _negamax(self, board, color, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % CHECK_TIME_EVERY == 0:
+            self._check_stop()
+
+        key = position_key(board, color)
+        entry = self.tt.probe(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, entry_score, flag, tt_move = entry
+            entry_score = _score_from_tt(entry_score, ply)
+            if entry_depth >= depth and ply > 0:
+                if flag == EXACT:
+                    return entry_score
+                if flag == LOWER_BOUND and entry_score >= beta:
+                    return entry_score
+                if flag == UPPER_BOUND and entry_score <= alpha:
+                    return entry_score
+
+        if depth == 0:
+            return evaluate(board, color, self.pawn_cache)
+        start, end = self.move_stack.generate(board, color, ply)
+        if start == end:
+            # Xeque-mate ou afogamento
+            return -MATE_SCORE + ply if board.is_in_check(color) else 0
+        self._order_moves(board, self.move_stack.buffer, start, end, tt_move)
+
+        original_alpha = alpha
+        best_score = -MATE_SCORE
+        best_move = None
+        enemy = other_color(color)
+        buffer = self.move_stack.buffer
+        for i in range(start, end):
+            move = buffer[i]
+            captured = make_encoded_move(board, move)
+            try:
+                score = -self._negamax(board, enemy, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                unmake_encoded_move(board, move, captured)
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if ply == 0:
+            self.root_move = best_move
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, _score_to_tt(best_score, ply), flag, best_move)
+        return best_score
+
+
+class Ponderer:
+    '''Busca em segundo plano durante a vez do adversário (ponder).
+
+    Faz o lance esperado do adversário (o melhor lance guardado na tabela de
+    transposição) numa cópia do jogo e busca a posição resultante numa thread,
+    preenchendo a tabela compartilhada. Se não houver lance esperado, busca a
+    própria posição do adversário, o que também explora as suas respostas.
+    '''
+    def __init__(self, tt, max_depth=64):
+        self.tt = tt
+        self.max_depth = max_depth
+        self.thread = None
+        self.stop_event = None
+        self.predicted_key = None
+        self.result = None
+
+    @property
+    def pondering(self):
+        return self.thread is not None
+
+    def start(self, game):
+        # Importado aqui porque game.py não depende do motor
+        from game import Game
+
+        self.stop()
+        copy = Game(game.to_fen())
+        color = copy.current_turn
+        entry = self.tt.probe(position_key(copy.board, color))
+        predicted_move = entry[3] if entry else None
+        if predicted_move is not None:
+            make_encoded_move(copy.board, predicted_move)
+            color = other_color(color)
+        self.predicted_key = position_key(copy.board, color)
+        self.result = None
+        self.stop_event = threading.Event()
+        search = Search(tt=self.tt)
+
+        def run():
+            self.result = search.search(copy.board, color, max_depth=self.max_depth,
+                                        stop_event=self.stop_event)
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''Interrompe a busca em segundo plano. A tabela de transposição mantém
+        tudo o que foi explorado.
+        '''
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+
+    def take_result(self, board, color):
+        '''Resultado completo do ponder se a posição atual é a que foi prevista,
+        ou None. Deve ser chamado depois de stop().
+        '''
+        if self.result is not None and position_key(board, color) == self.predicted_key:
+            return self.result
+        return None
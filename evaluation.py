@@ -0,0 +1,343 @@
+'''Avaliação da posição com tabelas peça-casa (PST) para meio-jogo e final.
+
+As parcelas de material e PST são mantidas de forma incremental pelo Board em
+set_piece (ver Board.mg_score, Board.eg_score e Board.phase), de modo que a
+avaliação de uma folha da busca é O(1). evaluate_full recalcula tudo varrendo
+o tabuleiro e serve de referência (ver bench_evaluation.py).
+
+Os termos de estrutura de peões (dobrados, isolados, atrasados, passados) só
+mudam quando um peão se move ou é capturado; ficam num PawnCache indexado pela
+chave de peões mantida pelo Board (Board.pawn_key).
+
+As tabelas estão do ponto de vista das brancas, com a linha 0 sendo a oitava
+fileira, como em Board.board; para as pretas a casa é espelhada (square ^ 56).
+'''
+
+# Valores de material por fase, em centipeões
+MG_VALUES = {'P': 82, 'N': 337, 'B': 365, 'R': 477, 'Q': 1025, 'K': 0}
+EG_VALUES = {'P': 94, 'N': 281, 'B': 297, 'R': 512, 'Q': 936, 'K': 0}
+
+# Peso de cada peça no cálculo da fase (24 = todas as peças, meio-jogo puro)
+PHASE_WEIGHTS = {'P': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+MAX_PHASE = 24
+
+PAWN_MG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+
+PAWN_EG = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     15,  15,  15,  15,  15,  15,  15,  15,
+      5,   5,   5,   5,   5,   5,   5,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+
+KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+]
+
+BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+]
+
+ROOK = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+]
+
+QUEEN = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+
+KING_MG = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+]
+
+KING_EG = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+PST_MG = {'P': PAWN_MG, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING_MG}
+PST_EG = {'P': PAWN_EG, 'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING_EG}
+
+
+def _signed_table(values, tables, color, symbol):
+    # Material + PST já com sinal: positivo para as brancas, negativo para as pretas
+    if color == 'white':
+        return [values[symbol] + tables[symbol][square] for square in range(64)]
+    return [-(values[symbol] + tables[symbol][square ^ 56]) for square in range(64)]
+
+
+# Contribuição de cada (cor, símbolo) em cada casa, usada por Board.set_piece
+MG_TABLE = {(color, symbol): _signed_table(MG_VALUES, PST_MG, color, symbol)
+            for color in ('white', 'black') for symbol in 'PNBRQK'}
+EG_TABLE = {(color, symbol): _signed_table(EG_VALUES, PST_EG, color, symbol)
+            for color in ('white', 'black') for symbol in 'PNBRQK'}
+
+
+# Termos de estrutura de peões (mg, eg), do ponto de vista do dono do peão
+DOUBLED_PAWN = (-10, -20)
+ISOLATED_PAWN = (-10, -15)
+BACKWARD_PAWN = (-8, -10)
+# Bônus de peão passado por fileiras avançadas (0 = fileira inicial)
+PASSED_PAWN_MG = [0, 5, 10, 15, 25, 40, 60, 0]
+PASSED_PAWN_EG = [0, 10, 20, 35, 55, 80, 110, 0]
+# Escudo de peões do rei (só no meio-jogo): uma e duas fileiras à frente
+PAWN_SHIELD_MG = (10, 5)
+
+PAWN_CACHE_SIZE = 1 << 14
+SHIELD_CACHE_SIZE = 16  # escudos guardados por estrutura de peões (pares de posições dos reis)
+
+
+def _bit(row, col):
+    return 1 << (row * 8 + col)
+
+
+def _mask(squares):
+    mask = 0
+    for row, col in squares:
+        if 0 <= row < 8 and 0 <= col < 8:
+            mask |= _bit(row, col)
+    return mask
+
+
+# Para cada cor, linhas "à frente" de um peão: as brancas avançam para a linha 0
+_AHEAD = {'white': lambda row: range(row - 1, -1, -1), 'black': lambda row: range(row + 1, 8)}
+_BEHIND_OR_LEVEL = {'white': lambda row: range(row, 8), 'black': lambda row: range(row, -1, -1)}
+_FORWARD = {'white': -1, 'black': 1}
+
+FILE_MASKS = [_mask((row, col) for row in range(8)) for col in range(8)]
+ADJACENT_FILES_MASKS = [(FILE_MASKS[col - 1] if col > 0 else 0) | (FILE_MASKS[col + 1] if col < 7 else 0)
+                        for col in range(8)]
+# Casas à frente, na mesma coluna e nas adjacentes: sem peões inimigos nelas, o peão é passado
+PASSED_MASKS = {color: [_mask((r, c) for r in _AHEAD[color](sq // 8) for c in (sq % 8 - 1, sq % 8, sq % 8 + 1))
+                        for sq in range(64)]
+                for color in ('white', 'black')}
+# Casas nas colunas adjacentes na mesma fileira ou atrás: peões amigos ali podem apoiar o avanço
+SUPPORT_MASKS = {color: [_mask((r, c) for r in _BEHIND_OR_LEVEL[color](sq // 8) for c in (sq % 8 - 1, sq % 8 + 1))
+                         for sq in range(64)]
+                 for color in ('white', 'black')}
+# Casas de onde um peão inimigo ataca a casa de avanço do peão
+STOP_ATTACK_MASKS = {color: [_mask((sq // 8 + 2 * _FORWARD[color], sq % 8 + dc) for dc in (-1, 1))
+                             for sq in range(64)]
+                     for color in ('white', 'black')}
+SHIELD_MASKS = {color: [[_mask((sq // 8 + distance * _FORWARD[color], sq % 8 + dc) for dc in (-1, 0, 1))
+                         for sq in range(64)] for distance in (1, 2)]
+                for color in ('white', 'black')}
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+class PawnEntry:
+    '''Resultado da análise de uma estrutura de peões: pontuação (do ponto de
+    vista das brancas), bitboards dos peões e máscaras dos peões passados.
+    '''
+    __slots__ = ('mg', 'eg', 'pawns', 'passed', 'shields')
+
+    def __init__(self, mg, eg, pawns, passed):
+        self.mg = mg
+        self.eg = eg
+        self.pawns = pawns
+        self.passed = passed
+        # Escudo de peões já calculado para cada par de posições dos reis, no
+        # máximo SHIELD_CACHE_SIZE (esvaziado ao encher)
+        self.shields = {}
+
+
+def compute_pawn_entry(board):
+    '''Analisa a estrutura de peões do tabuleiro: peões dobrados, isolados,
+    atrasados e passados.
+    '''
+    pawns = {'white': 0, 'black': 0}
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece is not None and piece.symbol == 'P':
+                pawns[piece.color] |= _bit(row, col)
+
+    mg = eg = 0
+    passed = {'white': 0, 'black': 0}
+    for color, sign in (('white', 1), ('black', -1)):
+        own = pawns[color]
+        enemy = pawns['black' if color == 'white' else 'white']
+        for col in range(8):
+            count = _popcount(own & FILE_MASKS[col])
+            if count > 1:
+                mg += sign * DOUBLED_PAWN[0] * (count - 1)
+                eg += sign * DOUBLED_PAWN[1] * (count - 1)
+        remaining = own
+        while remaining:
+            low_bit = remaining & -remaining
+            square = low_bit.bit_length() - 1
+            remaining ^= low_bit
+            row, col = divmod(square, 8)
+            if not own & ADJACENT_FILES_MASKS[col]:
+                mg += sign * ISOLATED_PAWN[0]
+                eg += sign * ISOLATED_PAWN[1]
+            elif not own & SUPPORT_MASKS[color][square] and enemy & STOP_ATTACK_MASKS[color][square]:
+                mg += sign * BACKWARD_PAWN[0]
+                eg += sign * BACKWARD_PAWN[1]
+            if not enemy & PASSED_MASKS[color][square]:
+                passed[color] |= low_bit
+                advanced = 6 - row if color == 'white' else row - 1
+                mg += sign * PASSED_PAWN_MG[advanced]
+                eg += sign * PASSED_PAWN_EG[advanced]
+    return PawnEntry(mg, eg, pawns, passed)
+
+
+class PawnCache:
+    '''Cache de tamanho fixo das análises de estrutura de peões, indexado pela
+    chave de peões do tabuleiro (Board.pawn_key). Em caso de colisão de índice a
+    entrada antiga é substituída.
+    '''
+    def __init__(self, size=PAWN_CACHE_SIZE):
+        # Tamanho arredondado para potência de 2, para indexar com uma máscara
+        size = 1 << max(size - 1, 0).bit_length()
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, board):
+        key = board.pawn_key
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.entries[index]
+        self.misses += 1
+        entry = compute_pawn_entry(board)
+        self.keys[index] = key
+        self.entries[index] = entry
+        return entry
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+                'size': len(self.keys)}
+
+    def clear(self):
+        self.keys = [None] * len(self.keys)
+        self.entries = [None] * len(self.entries)
+        self.hits = 0
+        self.misses = 0
+
+
+_default_pawn_cache = PawnCache()
+
+
+def _king_shield(board, pawns):
+    # Escudo de peões: depende da posição do rei, então fica fora do cache
+    score = 0
+    for color, sign in (('white', 1), ('black', -1)):
+        king = board.king_squares[color]
+        if king is None:
+            continue
+        square = king[0] * 8 + king[1]
+        own = pawns[color]
+        for distance, bonus in enumerate(PAWN_SHIELD_MG):
+            score += sign * bonus * _popcount(own & SHIELD_MASKS[color][distance][square])
+    return score
+
+
+def _taper(mg_score, eg_score, phase):
+    phase = min(phase, MAX_PHASE)
+    return (mg_score * phase + eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+def evaluate(board, color, pawn_cache=None):
+    '''Avaliação do ponto de vista de 'color', a partir das parcelas mantidas
+    de forma incremental pelo tabuleiro e da estrutura de peões em cache.
+    Cada busca deve usar o seu próprio PawnCache; sem ele, um cache do módulo
+    é usado.
+    '''
+    entry = (pawn_cache or _default_pawn_cache).probe(board)
+    kings = board.king_squares
+    kings = (kings['white'], kings['black'])
+    shields = entry.shields
+    shield = shields.get(kings)
+    if shield is None:
+        if len(shields) >= SHIELD_CACHE_SIZE:
+            shields.clear()
+        shield = shields[kings] = _king_shield(board, entry.pawns)
+    mg_score = board.mg_score + entry.mg + shield
+    score = _taper(mg_score, board.eg_score + entry.eg, board.phase)
+    return score if color == 'white' else -score
+
+
+def evaluate_full(board, color):
+    '''Mesma avaliação de evaluate, recalculada varrendo o tabuleiro.
+    '''
+    mg_score = eg_score = phase = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece is None:
+                continue
+            kind = (piece.color, piece.symbol)
+            square = row * 8 + col
+            mg_score += MG_TABLE[kind][square]
+            eg_score += EG_TABLE[kind][square]
+            phase += PHASE_WEIGHTS[piece.symbol]
+    entry = compute_pawn_entry(board)
+    mg_score += entry.mg + _king_shield(board, entry.pawns)
+    score = _taper(mg_score, eg_score + entry.eg, phase)
+    return score if color == 'white' else -score
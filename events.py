@@ -0,0 +1,135 @@
+'''Eventos do jogo e registro assíncrono em log.
+
+Game.make_move publica os eventos num EventBus em vez de escrever no console.
+Sem assinantes, o custo no caminho crítico é um único teste de atributo
+(EventBus.active); com assinantes, cada evento é um dict com a chave 'type'
+e os dados do evento.
+
+AsyncLogWriter é um assinante que formata os eventos e os escreve em lotes
+numa thread separada, para que terminais lentos ou pipes não bloqueiem o jogo.
+'''
+
+import queue
+import threading
+
+MOVE_MADE = 'move_made'
+CAPTURE = 'capture'
+CHECK = 'check'
+ILLEGAL_MOVE = 'illegal_move'
+GAME_OVER = 'game_over'
+ALL_EVENTS = '*'
+
+
+class EventBus:
+    '''Registro de callbacks por tipo de evento.
+    '''
+    def __init__(self):
+        self._listeners = {}
+        self.active = False
+
+    def subscribe(self, event_type, callback):
+        '''Registra callback(event) para o tipo de evento (ou ALL_EVENTS).
+        '''
+        self._listeners.setdefault(event_type, []).append(callback)
+        self.active = True
+
+    def unsubscribe(self, event_type, callback):
+        listeners = self._listeners.get(event_type, [])
+        if callback in listeners:
+            listeners.remove(callback)
+        if not listeners:
+            self._listeners.pop(event_type, None)
+        self.active = bool(self._listeners)
+
+    def has_listeners(self, event_type):
+        return event_type in self._listeners or ALL_EVENTS in self._listeners
+
+    def emit(self, event_type, **data):
+        if not self.has_listeners(event_type):
+            return
+        event = dict(data, type=event_type)
+        for callback in self._listeners.get(event_type, ()):
+            callback(event)
+        for callback in self._listeners.get(ALL_EVENTS, ()):
+            callback(event)
+
+
+def format_event(event):
+    '''Texto legível de um evento, para o console ou arquivos de log.
+    '''
+    event_type = event['type']
+    if event_type == MOVE_MADE:
+        start_row, start_col, end_row, end_col = event['move']
+        return f"Movimento realizado: {start_row},{start_col} -> {end_row},{end_col}"
+    if event_type == CAPTURE:
+        return f"Peça {event['piece']} capturada!"
+    if event_type == CHECK:
+        return f"Xeque no rei {event['color']}!"
+    if event_type == ILLEGAL_MOVE:
+        if event['reason'] == 'not_your_piece':
+            return "Movimento inválido: Nenhuma peça sua na posição inicial ou não é seu turno."
+        return "Movimento inválido para a peça selecionada."
+    if event_type == GAME_OVER:
+        if event['winner']:
+            return f"Xeque-mate! Vencedor: {event['winner']}"
+        return "Afogamento: empate."
+    return str(event)
+
+
+class AsyncLogWriter:
+    '''Escreve os eventos formatados num stream, em lotes, numa thread própria.
+
+    Com enabled=False nada é assinado e o jogo não paga nenhum custo.
+    '''
+    def __init__(self, stream, enabled=True, batch_size=256, flush_interval=0.1):
+        self.stream = stream
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._buses = []
+        self._thread = None
+        if enabled:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def attach(self, bus):
+        if self.enabled:
+            bus.subscribe(ALL_EVENTS, self._queue.put)
+            self._buses.append(bus)
+
+    def detach(self, bus):
+        if bus in self._buses:
+            bus.unsubscribe(ALL_EVENTS, self._queue.put)
+            self._buses.remove(bus)
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            while event is not None:
+                batch.append(format_event(event))
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.stream.write('\n'.join(batch) + '\n')
+                self.stream.flush()
+            if event is None:
+                return
+
+    def close(self):
+        '''Desassina, escreve o que estiver pendente e encerra a thread.
+        '''
+        for bus in list(self._buses):
+            self.detach(bus)
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
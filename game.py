@@ -1,11 +1,20 @@
-from board import Board
+from board import Board, ZOBRIST_BLACK_TO_MOVE
+from events import EventBus, MOVE_MADE, CAPTURE, CHECK, ILLEGAL_MOVE, GAME_OVER
+from moves import legal_moves
 from pieces import Pawn, Rook, Knight, Bishop, Queen, King
 
+PIECE_CLASSES = {'P': Pawn, 'R': Rook, 'N': Knight, 'B': Bishop, 'Q': Queen, 'K': King}
+
+
 class Game:
-    def __init__(self):
+    def __init__(self, fen=None):
         self.board = Board()
-        self.initialize_game()
         self.current_turn = 'white'
+        self.events = EventBus()
+        if fen is None:
+            self.initialize_game()
+        else:
+            self.load_fen(fen)
 
     def initialize_game(self):
         # Coloca os peões
@@ -39,38 +48,145 @@ class Game:
         self.board.set_piece(0, 4, King('black', 0, 4))
         self.board.set_piece(7, 4, King('white', 7, 4))
 
+    def load_fen(self, fen):
+        '''Carrega a posição a partir de uma string FEN. Roque, en passant e
+        contadores de lances ainda não são suportados e são ignorados.
+        '''
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(rows) != 8:
+            raise ValueError(f"FEN inválida: {fen!r}")
+        for row, row_text in enumerate(rows):
+            col = 0
+            for char in row_text:
+                if char in '12345678':
+                    col += int(char)
+                    continue
+                piece_class = PIECE_CLASSES.get(char.upper())
+                if piece_class is None or col > 7:
+                    raise ValueError(f"FEN inválida: {fen!r}")
+                color = 'white' if char.isupper() else 'black'
+                piece = piece_class(color, row, col)
+                if piece_class is Pawn:
+                    piece.has_moved = row != (6 if color == 'white' else 1)
+                self.board.set_piece(row, col, piece)
+                col += 1
+            if col != 8:
+                raise ValueError(f"FEN inválida: {fen!r}")
+        self.current_turn = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+
+    def to_fen(self):
+        '''Representação FEN da posição atual.
+        '''
+        rows = []
+        for row in range(8):
+            row_text = ''
+            empty = 0
+            for col in range(8):
+                piece = self.board.get_piece(row, col)
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row_text += str(empty)
+                    empty = 0
+                row_text += piece.symbol if piece.color == 'white' else piece.symbol.lower()
+            if empty:
+                row_text += str(empty)
+            rows.append(row_text)
+        side = 'w' if self.current_turn == 'white' else 'b'
+        return f"{'/'.join(rows)} {side} - - 0 1"
+
     def make_move(self, start_row, start_col, end_row, end_col):
         piece = self.board.get_piece(start_row, start_col)
+        events = self.events
 
         if not piece or piece.color != self.current_turn:
-            print("Movimento inválido: Nenhuma peça sua na posição inicial ou não é seu turno.")
+            if events.active:
+                events.emit(ILLEGAL_MOVE, move=(start_row, start_col, end_row, end_col),
+                            reason='not_your_piece')
             return False
 
         if piece.is_valid_move(end_row, end_col, self.board):
-            # Realiza o movimento
-            target_piece = self.board.get_piece(end_row, end_col)
-            if target_piece:
-                print(f"Peça {target_piece.__repr__()} capturada!")
-
-            self.board.set_piece(end_row, end_col, piece)
-            self.board.set_piece(start_row, start_col, None)
-            piece.row = end_row
-            piece.col = end_col
-            piece.has_moved = True
-
-            # Troca o turno
-            self.current_turn = 'black' if self.current_turn == 'white' else 'white'
+            self._apply_move(piece, start_row, start_col, end_row, end_col)
             return True
         else:
-            print("Movimento inválido para a peça selecionada.")
+            if events.active:
+                events.emit(ILLEGAL_MOVE, move=(start_row, start_col, end_row, end_col),
+                            reason='invalid_move')
             return False
 
+    def make_encoded_move(self, move):
+        '''Faz um lance na codificação de 16 bits (moves.py). Só confere que a
+        peça de origem é do lado a jogar (devolvendo False, como make_move); a
+        legalidade não é validada: o lance deve vir de legal_moves() para a
+        posição atual.
+        '''
+        start = move & 63
+        end = (move >> 6) & 63
+        start_row, start_col, end_row, end_col = start >> 3, start & 7, end >> 3, end & 7
+        piece = self.board.board[start_row][start_col]
+        if piece is None or piece.color != self.current_turn:
+            if self.events.active:
+                self.events.emit(ILLEGAL_MOVE, move=(start_row, start_col, end_row, end_col),
+                                 reason='not_your_piece')
+            return False
+        self._apply_move(piece, start_row, start_col, end_row, end_col)
+        return True
+
+    def _apply_move(self, piece, start_row, start_col, end_row, end_col):
+        # Realiza o movimento
+        target_piece = self.board.get_piece(end_row, end_col)
+
+        self.board.set_piece(end_row, end_col, piece)
+        self.board.set_piece(start_row, start_col, None)
+        piece.row = end_row
+        piece.col = end_col
+        piece.has_moved = True
+
+        # Troca o turno
+        self.current_turn = 'black' if self.current_turn == 'white' else 'white'
+
+        if self.events.active:
+            self._emit_move_events(piece, target_piece, (start_row, start_col, end_row, end_col))
+
+    def legal_moves(self):
+        '''Lances legais do lado a jogar, num array('H') de lances codificados.
+        '''
+        return legal_moves(self.board, self.current_turn)
+
+    def _emit_move_events(self, piece, target_piece, move):
+        events = self.events
+        events.emit(MOVE_MADE, move=move, piece=repr(piece), color=piece.color)
+        if target_piece:
+            events.emit(CAPTURE, move=move, piece=repr(target_piece), color=target_piece.color)
+        in_check = self.board.is_in_check(self.current_turn)
+        if in_check:
+            events.emit(CHECK, move=move, color=self.current_turn)
+        # Detectar o fim de jogo exige gerar lances; só é feito se alguém escuta
+        if events.has_listeners(GAME_OVER) and not self.has_legal_moves(self.current_turn):
+            events.emit(GAME_OVER, move=move, winner=piece.color if in_check else None)
+
+    def has_legal_moves(self, color):
+        # Gerador dos mapas de ataque (moves.py), sem simular cada lance
+        return len(legal_moves(self.board, color)) > 0
+
+    def position_hash(self):
+        '''Chave Zobrist da posição atual, incluindo o lado a jogar.
+        '''
+        if self.current_turn == 'black':
+            return self.board.zobrist_key ^ ZOBRIST_BLACK_TO_MOVE
+        return self.board.zobrist_key
+
     def display_board(self):
         self.board.display()
 
 # Exemplo de uso (para teste inicial)
 if __name__ == "__main__":
+    from events import ALL_EVENTS, format_event
+
     game = Game()
+    game.events.subscribe(ALL_EVENTS, lambda event: print(format_event(event)))
     game.display_board()
 
     print("\nTentando mover peão branco de (6,0) para (4,0)")
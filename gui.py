@@ -1,22 +1,85 @@
+import functools
+import os
 import pygame
 import sys
 from game import Game
+from engine import Ponderer, Search
+from events import GAME_OVER
+
+# Caminho absoluto, para funcionar independentemente do diretório atual
+PIECES_IMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "chess_pieces.png")
+
+
+@functools.lru_cache(maxsize=None)
+def _sprite_sheet():
+    # Carregada uma vez por processo; convert() exige um modo de vídeo já definido
+    return pygame.image.load(PIECES_IMAGE_PATH).convert()
+
+
+@functools.lru_cache(maxsize=None)
+def piece_sprites(square_size):
+    '''Imagens das peças indexadas por (cor, símbolo), redimensionadas para
+    square_size. Ficam em cache por tamanho e são compartilhadas entre as
+    instâncias, então não devem ser modificadas.
+    '''
+    sheet = _sprite_sheet()
+    images = {}
+    original_piece_width = sheet.get_width() // 6
+    original_piece_height = sheet.get_height() // 4
+
+    piece_order_symbols = [("K", 0), ("Q", 1), ("R", 2), ("B", 3), ("N", 4), ("P", 5)]
+
+    # Usar a linha 0 para peças brancas (contorno) e a linha 1 para peças pretas (preenchidas)
+    # A imagem fornecida tem as peças pretas preenchidas com preto, o que impede a transparência do branco.
+    # Vamos tentar usar as linhas 2 e 3, que são mais detalhadas e podem ter um fundo mais consistente.
+    # Após inspecionar a imagem, as linhas 0 e 2 são brancas, e as linhas 1 e 3 são pretas.
+    # Para ter um fundo branco para set_colorkey, precisamos de imagens com fundo branco.
+    # A imagem que o usuário enviou mostra que as peças brancas e pretas estão na linha 0 e 1, respectivamente, com fundo branco.
+    # Vamos usar a linha 0 para as peças brancas e a linha 1 para as peças pretas, e aplicar o set_colorkey.
+
+    color_row_map = {
+        "white": 0, # Peças brancas na primeira linha da imagem
+        "black": 1  # Peças pretas na segunda linha da imagem
+    }
+
+    for color, img_row_idx in color_row_map.items():
+        for piece_symbol, img_col_idx in piece_order_symbols:
+            x = img_col_idx * original_piece_width
+            y = img_row_idx * original_piece_height
+
+            piece_rect = pygame.Rect(x, y, original_piece_width, original_piece_height)
+
+            # Criar uma nova superfície para cada peça para lidar com a transparência
+            piece_surface = pygame.Surface((original_piece_width, original_piece_height))
+            piece_surface.blit(sheet, (0, 0), piece_rect)
+
+            # Definir o fundo branco como transparente
+            piece_surface.set_colorkey((255, 255, 255))
+
+            # Redimensionar a peça para o tamanho do quadrado
+            piece_surface = pygame.transform.scale(piece_surface, (square_size, square_size))
+
+            images[(color, piece_symbol)] = piece_surface
+    return images
+
 
 class ChessGUI:
-    def __init__(self):
+    # Cores (atributos de classe, compartilhados com DiagramRenderer em render.py)
+    WHITE_SQUARE_COLOR = (240, 217, 181)
+    BLACK_SQUARE_COLOR = (181, 136, 99)
+    HIGHLIGHT_COLOR = (255, 255, 0, 128)
+    POSSIBLE_MOVE_COLOR = (0, 255, 0, 128)
+    ATTACKED_COLOR = (255, 140, 0, 90)
+    HANGING_COLOR = (255, 0, 0, 120)
+    TEXT_COLOR = (0, 0, 0)
+
+    def __init__(self, computer_color=None, ponder=False, think_time=1.0, search_depth=4):
         pygame.init()
         self.BOARD_SIZE = 640
         self.SQUARE_SIZE = self.BOARD_SIZE // 8
         self.screen = pygame.display.set_mode((self.BOARD_SIZE, self.BOARD_SIZE + 100))
         pygame.display.set_caption("Jogo de Xadrez")
         
-        # Cores
-        self.WHITE_SQUARE_COLOR = (240, 217, 181)
-        self.BLACK_SQUARE_COLOR = (181, 136, 99)
-        self.HIGHLIGHT_COLOR = (255, 255, 0, 128)
-        self.POSSIBLE_MOVE_COLOR = (0, 255, 0, 128)
-        self.TEXT_COLOR = (0, 0, 0)
-        
         # Fonte
         self.font = pygame.font.Font(None, 36)
         
@@ -27,59 +90,33 @@ class ChessGUI:
         self.selected_piece = None
         self.selected_pos = None
         self.possible_moves = []
+        self.selected_moves = {}
+        self.show_threats = False
+
+        # Adversário do computador (opcional). Com ponder, o computador continua
+        # buscando durante a vez do jogador humano, sem aumentar o tempo por lance.
+        self.computer_color = computer_color
+        self.think_time = think_time
+        self.search_depth = search_depth
+        self.search = Search()
+        self.ponderer = Ponderer(self.search.tt) if ponder and computer_color else None
+        self.game_over = False
+        # O fim de jogo vem do evento de Game.make_move, que já gera os lances
+        # do lado a jogar uma vez por lance
+        self.game.events.subscribe(GAME_OVER, self.on_game_over)
         
         # Carregar imagens das peças
         self.piece_images = self.load_piece_images()
 
     def load_piece_images(self):
         try:
-            # Usar convert() para preparar para a colorkey
-            all_pieces_img = pygame.image.load("assets/chess_pieces.png").convert()
+            return piece_sprites(self.SQUARE_SIZE)
         except pygame.error as e:
             print(f"Erro ao carregar imagem: {e}")
             print("Certifique-se de que \
 assets/chess_pieces.png\" existe e está acessível.")
             sys.exit()
 
-        images = {}
-        original_piece_width = all_pieces_img.get_width() // 6
-        original_piece_height = all_pieces_img.get_height() // 4
-
-        piece_order_symbols = [("K", 0), ("Q", 1), ("R", 2), ("B", 3), ("N", 4), ("P", 5)]
-        
-        # Usar a linha 0 para peças brancas (contorno) e a linha 1 para peças pretas (preenchidas)
-        # A imagem fornecida tem as peças pretas preenchidas com preto, o que impede a transparência do branco.
-        # Vamos tentar usar as linhas 2 e 3, que são mais detalhadas e podem ter um fundo mais consistente.
-        # Após inspecionar a imagem, as linhas 0 e 2 são brancas, e as linhas 1 e 3 são pretas.
-        # Para ter um fundo branco para set_colorkey, precisamos de imagens com fundo branco.
-        # A imagem que o usuário enviou mostra que as peças brancas e pretas estão na linha 0 e 1, respectivamente, com fundo branco.
-        # Vamos usar a linha 0 para as peças brancas e a linha 1 para as peças pretas, e aplicar o set_colorkey.
-        
-        color_row_map = {
-            "white": 0, # Peças brancas na primeira linha da imagem
-            "black": 1  # Peças pretas na segunda linha da imagem
-        }
-
-        for color, img_row_idx in color_row_map.items():
-            for piece_symbol, img_col_idx in piece_order_symbols:
-                x = img_col_idx * original_piece_width
-                y = img_row_idx * original_piece_height
-                
-                piece_rect = pygame.Rect(x, y, original_piece_width, original_piece_height)
-                
-                # Criar uma nova superfície para cada peça para lidar com a transparência
-                piece_surface = pygame.Surface((original_piece_width, original_piece_height))
-                piece_surface.blit(all_pieces_img, (0, 0), piece_rect)
-                
-                # Definir o fundo branco como transparente
-                piece_surface.set_colorkey((255, 255, 255))
-                
-                # Redimensionar a peça para o tamanho do quadrado
-                piece_surface = pygame.transform.scale(piece_surface, (self.SQUARE_SIZE, self.SQUARE_SIZE))
-                
-                images[(color, piece_symbol)] = piece_surface
-        return images
-
     def draw_board(self):
         for row in range(8):
             for col in range(8):
@@ -88,6 +125,22 @@ assets/chess_pieces.png\" existe e está acessível.")
                                  self.SQUARE_SIZE, self.SQUARE_SIZE)
                 pygame.draw.rect(self.screen, color, rect)
 
+    def draw_threats(self):
+        # Sombreia as peças atacadas pelo adversário; as sem defesa em vermelho
+        board = self.game.board
+        for row in range(8):
+            for col in range(8):
+                piece = board.get_piece(row, col)
+                if not piece:
+                    continue
+                enemy = 'black' if piece.color == 'white' else 'white'
+                if not board.is_square_attacked(row, col, enemy):
+                    continue
+                color = self.HANGING_COLOR if board.is_hanging(row, col) else self.ATTACKED_COLOR
+                threat_surface = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
+                threat_surface.fill(color)
+                self.screen.blit(threat_surface, (col * self.SQUARE_SIZE, row * self.SQUARE_SIZE))
+
     def draw_pieces(self):
         for row in range(8):
             for col in range(8):
@@ -143,19 +196,55 @@ assets/chess_pieces.png\" existe e está acessível.")
             if piece and piece.color == self.game.current_turn:
                 self.selected_piece = piece
                 self.selected_pos = (row, col)
-                self.possible_moves = piece.get_possible_moves(self.game.board)
+                # Lances codificados (moves.py) da peça, indexados pela casa de destino
+                square = row * 8 + col
+                self.selected_moves = {(move >> 6) & 63: move for move in self.game.legal_moves()
+                                       if move & 63 == square}
+                self.possible_moves = [divmod(target, 8) for target in self.selected_moves]
         else:
-            if (row, col) in self.possible_moves:
-                start_row, start_col = self.selected_pos
-                if self.game.make_move(start_row, start_col, row, col):
-                    print(f"Movimento realizado: {start_row},{start_col} -> {row},{col}")
-                else:
-                    print("Movimento inválido")
+            move = self.selected_moves.get(row * 8 + col)
+            if move is not None:
+                self.game.make_encoded_move(move)
             
             self.selected_piece = None
             self.selected_pos = None
+            self.selected_moves = {}
             self.possible_moves = []
 
+    def play_computer_move(self):
+        board = self.game.board
+        color = self.game.current_turn
+        result = None
+        if self.ponderer:
+            self.ponderer.stop()
+            result = self.ponderer.take_result(board, color)
+        # Se o ponder previu o lance e já alcançou a profundidade desejada,
+        # a resposta é imediata; senão a busca reaproveita a tabela de transposição.
+        if result is None or result[1] is None or result[2] < self.search_depth:
+            result = self.search.search(board, color, max_depth=self.search_depth,
+                                        time_limit=self.think_time)
+        if result[1] is not None:
+            self.game.make_move(*result[1])
+            return
+        # A busca pode parar (tempo ou parada) antes de completar a profundidade 1
+        legal = self.game.legal_moves()
+        if legal:
+            self.game.make_encoded_move(legal[0])
+
+    def on_game_over(self, event):
+        # Fim de jogo (mate ou afogamento): o lado a jogar não tem lances
+        self.game_over = True
+        if self.ponderer:
+            self.ponderer.stop()
+
+    def update_computer(self):
+        if self.game_over or self.computer_color is None:
+            return
+        if self.game.current_turn == self.computer_color:
+            self.play_computer_move()
+        elif self.ponderer and not self.ponderer.pondering:
+            self.ponderer.start(self.game)
+
     def run(self):
         clock = pygame.time.Clock()
         running = True
@@ -167,10 +256,17 @@ assets/chess_pieces.png\" existe e está acessível.")
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:
                         self.handle_click(event.pos)
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_t:
+                        self.show_threats = not self.show_threats
             
+            self.update_computer()
+
             self.screen.fill((255, 255, 255))
             
             self.draw_board()
+            if self.show_threats:
+                self.draw_threats()
             self.draw_highlights()
             self.draw_pieces()
             self.draw_info()
@@ -178,5 +274,7 @@ assets/chess_pieces.png\" existe e está acessível.")
             pygame.display.flip()
             clock.tick(60)
         
+        if self.ponderer:
+            self.ponderer.stop()
         pygame.quit()
         sys.exit()
\ No newline at end of file
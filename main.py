@@ -11,6 +11,11 @@ Controles:
 - Clique no destino para mover a peça
 - As casas verdes mostram os movimentos possíveis
 - A casa amarela mostra a peça selecionada
+- Tecla T liga/desliga o mapa de ameaças (laranja: peça atacada, vermelho: peça sem defesa)
+
+Jogar contra o computador:
+python3 main.py --computer black [--ponder] [--think-time 1.0]
+(com --ponder o computador continua pensando durante a sua vez)
 
 Funcionalidades implementadas:
 - Movimentos válidos para todas as peças
@@ -20,16 +25,37 @@ Funcionalidades implementadas:
 - Alternância de turnos
 """
 
+import argparse
+import sys
+
+from events import AsyncLogWriter
 from gui import ChessGUI
 
 def main():
+    parser = argparse.ArgumentParser(description="Jogo de Xadrez em Python")
+    parser.add_argument('--computer', choices=['white', 'black'],
+                        help="Cor jogada pelo computador (padrão: dois jogadores humanos).")
+    parser.add_argument('--ponder', action='store_true',
+                        help="O computador pensa em segundo plano durante a vez do jogador.")
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help="Tempo máximo, em segundos, por lance do computador.")
+    parser.add_argument('--no-log', action='store_true',
+                        help="Não escreve os lances e capturas no console.")
+    args = parser.parse_args()
+
     print("Iniciando o Jogo de Xadrez...")
     print("Clique nas peças para selecioná-las e mover.")
     print("Feche a janela para sair do jogo.")
     
     try:
-        game_gui = ChessGUI()
-        game_gui.run()
+        game_gui = ChessGUI(computer_color=args.computer, ponder=args.ponder,
+                            think_time=args.think_time)
+        log_writer = AsyncLogWriter(sys.stdout, enabled=not args.no_log)
+        log_writer.attach(game_gui.game.events)
+        try:
+            game_gui.run()
+        finally:
+            log_writer.close()
     except Exception as e:
         print(f"Erro ao executar o jogo: {e}")
         print("Certifique-se de que o Pygame está instalado corretamente.")
@@ -0,0 +1,235 @@
+'''Codificação compacta de lances em 16 bits e listas de lances em arrays.
+
+Layout do lance (inteiro sem sinal de 16 bits):
+
+    bits 0-5    casa de origem (row * 8 + col)
+    bits 6-11   casa de destino
+    bits 12-13  peça de promoção (0 = cavalo, 1 = bispo, 2 = torre, 3 = rainha)
+    bits 14-15  tipo: NORMAL, PROMOTION, EN_PASSANT ou CASTLING
+
+O tabuleiro ainda não implementa promoção, roque nem en passant, então o
+gerador só produz lances NORMAL; os campos existem para que o formato não
+mude quando essas regras forem adicionadas.
+
+MoveStack guarda as listas de lances de todas as profundidades da busca num
+único array('H') pré-alocado, reaproveitado a cada nó, sem criar tuplas.
+'''
+
+from array import array
+
+from board import DIRECTION_SLIDERS, OPPOSITE_DIRECTION, RAYS
+
+NORMAL, PROMOTION, EN_PASSANT, CASTLING = 0, 1, 2, 3
+PROMOTION_PIECES = 'NBRQ'
+
+MAX_MOVES = 256  # limite de lances legais numa posição
+MAX_PLY = 128
+
+
+def encode_move(start_square, end_square, promotion=None, flag=NORMAL):
+    move = start_square | (end_square << 6) | (flag << 14)
+    if promotion is not None:
+        move |= PROMOTION_PIECES.index(promotion) << 12
+    return move
+
+
+def move_start(move):
+    return move & 63
+
+
+def move_end(move):
+    return (move >> 6) & 63
+
+
+def move_flag(move):
+    return move >> 14
+
+
+def move_promotion(move):
+    '''Símbolo da peça de promoção, ou None se o lance não é uma promoção.
+    '''
+    if move >> 14 != PROMOTION:
+        return None
+    return PROMOTION_PIECES[(move >> 12) & 3]
+
+
+def encode_tuple(start_row, start_col, end_row, end_col):
+    '''Converte um lance no formato de Game.make_move.
+    '''
+    return (start_row * 8 + start_col) | ((end_row * 8 + end_col) << 6)
+
+
+def decode_tuple(move):
+    '''Converte para (start_row, start_col, end_row, end_col).
+    '''
+    start = move & 63
+    end = (move >> 6) & 63
+    return start >> 3, start & 7, end >> 3, end & 7
+
+
+def make_encoded_move(board, move):
+    '''Faz o lance no tabuleiro e devolve a peça capturada (para desfazer).
+    '''
+    start = move & 63
+    end = (move >> 6) & 63
+    start_row, start_col, end_row, end_col = start >> 3, start & 7, end >> 3, end & 7
+    piece = board.board[start_row][start_col]
+    captured = board.board[end_row][end_col]
+    board.set_piece(end_row, end_col, piece)
+    board.set_piece(start_row, start_col, None)
+    piece.row, piece.col = end_row, end_col
+    return captured
+
+
+def unmake_encoded_move(board, move, captured):
+    start = move & 63
+    end = (move >> 6) & 63
+    start_row, start_col, end_row, end_col = start >> 3, start & 7, end >> 3, end & 7
+    piece = board.board[end_row][end_col]
+    board.set_piece(start_row, start_col, piece)
+    board.set_piece(end_row, end_col, captured)
+    piece.row, piece.col = start_row, start_col
+
+
+def _pins(board, color, king):
+    '''Peças da cor cravadas no rei: {casa da peça: casas do raio entre o rei
+    e a peça que crava, inclusive esta}, onde a peça ainda pode se mover.
+    '''
+    rows = board.board
+    pins = {}
+    for direction, ray in enumerate(RAYS[king]):
+        blocker = None
+        for i, target in enumerate(ray):
+            piece = rows[target >> 3][target & 7]
+            if piece is None:
+                continue
+            if piece.color == color:
+                if blocker is not None:
+                    break
+                blocker = target
+                continue
+            if blocker is not None and piece.symbol in DIRECTION_SLIDERS[direction]:
+                pins[blocker] = set(ray[:i + 1])
+            break
+    return pins
+
+
+def _check_evasions(board, color, king):
+    '''Para o rei em xeque, devolve (casas onde as outras peças resolvem o
+    xeque, casas proibidas ao rei). As primeiras são a casa do atacante e as
+    casas entre ele e o rei (vazias no xeque duplo); as segundas, as casas atrás
+    do rei na linha de um atacante de longo alcance, que o mapa de ataques não
+    marca porque o próprio rei bloqueia o raio.
+    '''
+    rows = board.board
+    enemy = 'black' if color == 'white' else 'white'
+    attacks_from = board.attacks_from
+    checkers = [square for square in range(64)
+                if rows[square >> 3][square & 7] is not None
+                and rows[square >> 3][square & 7].color == enemy and king in attacks_from[square]]
+    blocks = set(checkers) if len(checkers) == 1 else set()
+    king_forbidden = set()
+    for checker in checkers:
+        if rows[checker >> 3][checker & 7].symbol not in 'RBQ':
+            continue
+        for direction, ray in enumerate(RAYS[king]):
+            if checker in ray:
+                if len(checkers) == 1:
+                    blocks.update(ray[:ray.index(checker)])
+                behind = RAYS[king][OPPOSITE_DIRECTION[direction]]
+                if behind:
+                    king_forbidden.add(behind[0])
+                break
+    return blocks, king_forbidden
+
+
+def generate_into(board, color, buffer, start):
+    '''Escreve os lances legais da cor em buffer a partir do índice start e
+    devolve o índice final.
+
+    Os destinos vêm do mapa de ataques do tabuleiro (mais os avanços de peão) e
+    a legalidade é decidida pelos mapas, sem simular o lance: o rei só vai para
+    casas não atacadas, uma peça cravada só se move no raio da cravada e, em
+    xeque, as outras peças só capturam o atacante ou se interpõem.
+    '''
+    end = start
+    rows = board.board
+    attacks_from = board.attacks_from
+    enemy = 'black' if color == 'white' else 'white'
+    enemy_attacks = board.attack_counts[enemy]
+    king_position = board.king_squares[color]
+    pins = {}
+    blocks = None
+    king_forbidden = ()
+    if king_position is not None:
+        king = king_position[0] * 8 + king_position[1]
+        pins = _pins(board, color, king)
+        if enemy_attacks[king]:
+            blocks, king_forbidden = _check_evasions(board, color, king)
+    step = -8 if color == 'white' else 8
+    start_row = 6 if color == 'white' else 1
+
+    for square in range(64):
+        piece = rows[square >> 3][square & 7]
+        if piece is None or piece.color != color:
+            continue
+        symbol = piece.symbol
+        if symbol == 'K':
+            for target in attacks_from[square]:
+                occupant = rows[target >> 3][target & 7]
+                if (occupant is None or occupant.color != color) and not enemy_attacks[target] \
+                        and target not in king_forbidden:
+                    buffer[end] = square | (target << 6)
+                    end += 1
+            continue
+        if blocks is not None and not blocks:
+            continue  # xeque duplo: só o rei se move
+        allowed = pins.get(square)
+        if blocks is not None:
+            allowed = blocks if allowed is None else allowed & blocks
+        if symbol == 'P':
+            for target in attacks_from[square]:
+                occupant = rows[target >> 3][target & 7]
+                if occupant is not None and occupant.color != color \
+                        and (allowed is None or target in allowed):
+                    buffer[end] = square | (target << 6)
+                    end += 1
+            target = square + step
+            if 0 <= target < 64 and rows[target >> 3][target & 7] is None:
+                if allowed is None or target in allowed:
+                    buffer[end] = square | (target << 6)
+                    end += 1
+                target += step
+                if square >> 3 == start_row and rows[target >> 3][target & 7] is None \
+                        and (allowed is None or target in allowed):
+                    buffer[end] = square | (target << 6)
+                    end += 1
+            continue
+        for target in attacks_from[square]:
+            occupant = rows[target >> 3][target & 7]
+            if (occupant is None or occupant.color != color) and (allowed is None or target in allowed):
+                buffer[end] = square | (target << 6)
+                end += 1
+    return end
+
+
+class MoveStack:
+    '''Listas de lances por profundidade num array('H') pré-alocado.
+    '''
+    def __init__(self, max_ply=MAX_PLY, max_moves=MAX_MOVES):
+        self.max_moves = max_moves
+        self.buffer = array('H', bytes(2 * max_ply * max_moves))
+
+    def generate(self, board, color, ply):
+        '''Gera os lances da profundidade 'ply' e devolve (início, fim) no buffer.
+        '''
+        start = ply * self.max_moves
+        return start, generate_into(board, color, self.buffer, start)
+
+
+def legal_moves(board, color):
+    '''Lances legais da cor num array('H') novo (para uso fora da busca).
+    '''
+    buffer = array('H', bytes(2 * MAX_MOVES))
+    end = generate_into(board, color, buffer, 0)
+    return buffer[:end]
@@ -1,6 +1,9 @@
 '''Este arquivo define as classes para cada peça do jogo de xadrez.
 '''
 
+# Valor material de cada peça, em centipeões
+PIECE_VALUES = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 20000}
+
 class Piece:
     '''Classe base para todas as peças.
     '''
@@ -51,12 +54,17 @@ class Piece:
         '''Retorna uma lista de movimentos válidos para a peça.
         '''
         possible_moves = []
-        for r in range(8):
-            for c in range(8):
-                if self.is_valid_move(r, c, board):
-                    possible_moves.append((r, c))
+        for r, c in sorted(self._candidate_squares(board)):
+            if self.is_valid_move(r, c, board):
+                possible_moves.append((r, c))
         return possible_moves
 
+    def _candidate_squares(self, board):
+        '''Casas de destino a testar: as casas atacadas pela peça, segundo o
+        mapa de ataques mantido pelo tabuleiro.
+        '''
+        return [divmod(square, 8) for square in board.attacks_from[self.row * 8 + self.col]]
+
     def _is_valid_move_logic(self, new_row, new_col, board):
         '''Lógica de movimento específica de cada peça (deve ser sobrescrita).
         '''
@@ -70,6 +78,16 @@ class Pawn(Piece):
         super().__init__(color, row, col)
         self.symbol = 'P'
 
+    def _candidate_squares(self, board):
+        # Além das capturas, o peão pode avançar uma ou duas casas
+        direction = -1 if self.color == 'white' else 1
+        candidates = super()._candidate_squares(board)
+        for step in (1, 2):
+            row = self.row + step * direction
+            if 0 <= row < 8:
+                candidates.append((row, self.col))
+        return candidates
+
     def _is_valid_move_logic(self, new_row, new_col, board):
         direction = -1 if self.color == 'white' else 1
         start_row = 6 if self.color == 'white' else 1
@@ -0,0 +1,302 @@
+'''Índice em disco de posições para busca em grandes arquivos de partidas.
+
+O indexador reproduz as partidas em paralelo e grava um arquivo ordenado,
+acessado via mmap, que mapeia a chave Zobrist da posição e a chave de material
+para os deslocamentos das partidas no arquivo de origem (ver archive.py).
+
+Layout do arquivo de índice (little-endian):
+
+    cabeçalho    MAGIC + 6 inteiros de 64 bits (ver HEADER)
+    seção pos    registros (chave, deslocamento) ordenados por chave Zobrist
+    seção mat    registros (chave, deslocamento) ordenados por chave de material
+    cercas pos   uma chave a cada FENCE_STRIDE registros da seção pos
+    cercas mat   idem para a seção mat
+
+As cercas funcionam como a página raiz de uma B-tree: ficam em memória, a busca
+binária nelas escolhe um bloco de FENCE_STRIDE registros e só esse bloco é
+tocado no mmap. Assim uma consulta lê poucas páginas do disco mesmo com
+centenas de milhões de posições.
+
+Uso:
+    python position_index.py build partidas.txt partidas.idx --workers 8
+    python position_index.py query partidas.idx --moves "e2e4 e7e5"
+    python position_index.py query partidas.idx --material KRPkr
+'''
+
+import argparse
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from archive import format_move, parse_game_line, read_game_at, read_games, replay, split_archive
+from batch import worker_pool
+from board import material_key_from_string
+
+MAGIC = b'XDXIDX01'
+HEADER = struct.Struct('<8s6Q')  # magic, n_pos, n_mat, pos_at, mat_at, fences_pos_at, fences_mat_at
+RECORD = struct.Struct('<QQ')  # chave, deslocamento da partida
+FENCE = struct.Struct('<Q')
+FENCE_STRIDE = 256
+
+CHUNK_SIZE = 1 << 20  # bytes do arquivo de origem por tarefa
+RUN_SIZE = 2_000_000  # registros em memória antes de despejar um run ordenado
+
+
+def _index_chunk(task):
+    '''Tarefa executada pelos processos: reproduz as partidas de um trecho do
+    arquivo e devolve os registros (já sem repetições dentro de cada partida).
+    '''
+    path, start, end = task
+    pos_records = []
+    mat_records = []
+    for offset, moves in read_games(path, start, end):
+        positions = set()
+        materials = set()
+        for game in replay(moves):
+            positions.add(game.position_hash())
+            materials.add(game.board.material_key)
+        pos_records.extend((key, offset) for key in positions)
+        mat_records.extend((key, offset) for key in materials)
+    return pos_records, mat_records
+
+
+class _RunWriter:
+    '''Acumula registros e os despeja em arquivos temporários ordenados
+    (ordenação externa), para indexar arquivos maiores que a memória.
+    '''
+    def __init__(self, tmp_dir, run_size):
+        self.tmp_dir = tmp_dir
+        self.run_size = run_size
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def extend(self, records):
+        self.buffer.extend(records)
+        self.count += len(records)
+        if len(self.buffer) >= self.run_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        fd, run_path = tempfile.mkstemp(suffix='.run', dir=self.tmp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            pack = RECORD.pack
+            f.writelines(pack(key, offset) for key, offset in self.buffer)
+        self.runs.append(run_path)
+        self.buffer = []
+
+    def merged(self):
+        '''Gera todos os registros em ordem, fazendo a intercalação dos runs.
+        '''
+        self.flush()
+        return heapq.merge(*(_read_run(path) for path in self.runs))
+
+    def cleanup(self):
+        for path in self.runs:
+            os.remove(path)
+        self.runs = []
+
+
+def _read_run(path, block_records=65536):
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(RECORD.size * block_records)
+            if not block:
+                return
+            yield from RECORD.iter_unpack(block)
+
+
+def _write_section(out, records):
+    '''Grava os registros ordenados e devolve (quantidade, cercas).
+    '''
+    fences = []
+    count = 0
+    pack = RECORD.pack
+    for key, offset in records:
+        if count % FENCE_STRIDE == 0:
+            fences.append(key)
+        out.write(pack(key, offset))
+        count += 1
+    return count, fences
+
+
+def build_index(archive_path, index_path, workers=None, chunk_size=CHUNK_SIZE,
+                run_size=RUN_SIZE, tmp_dir=None):
+    '''Indexa o arquivo de partidas em paralelo e grava o índice em index_path.
+    Devolve (número de registros de posição, número de registros de material).
+    '''
+    tasks = split_archive(archive_path, chunk_size)
+    tmp_dir = tmp_dir or os.path.dirname(os.path.abspath(index_path))
+    pos_runs = _RunWriter(tmp_dir, run_size)
+    mat_runs = _RunWriter(tmp_dir, run_size)
+    try:
+        with worker_pool(workers) as pool:
+            for pos_records, mat_records in pool.imap_unordered(_index_chunk, tasks):
+                pos_runs.extend(pos_records)
+                mat_runs.extend(mat_records)
+
+        with open(index_path, 'wb') as out:
+            out.write(b'\0' * HEADER.size)
+            pos_at = out.tell()
+            n_pos, pos_fences = _write_section(out, pos_runs.merged())
+            mat_at = out.tell()
+            n_mat, mat_fences = _write_section(out, mat_runs.merged())
+            fences_pos_at = out.tell()
+            out.writelines(FENCE.pack(key) for key in pos_fences)
+            fences_mat_at = out.tell()
+            out.writelines(FENCE.pack(key) for key in mat_fences)
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, n_pos, n_mat, pos_at, mat_at, fences_pos_at, fences_mat_at))
+    finally:
+        pos_runs.cleanup()
+        mat_runs.cleanup()
+    return n_pos, n_mat
+
+
+class _Section:
+    '''Uma seção ordenada do índice, com as cercas carregadas em memória.
+    '''
+    def __init__(self, mm, at, count, fences_at):
+        self.mm = mm
+        self.at = at
+        self.count = count
+        n_fences = (count + FENCE_STRIDE - 1) // FENCE_STRIDE
+        self.fences = [key for (key,) in FENCE.iter_unpack(mm[fences_at:fences_at + n_fences * FENCE.size])]
+
+    def _key_at(self, i):
+        return RECORD.unpack_from(self.mm, self.at + i * RECORD.size)[0]
+
+    def _lower_bound(self, key):
+        # Escolhe o bloco pelas cercas e faz a busca binária só dentro dele
+        block = max(bisect.bisect_left(self.fences, key) - 1, 0)
+        lo = block * FENCE_STRIDE
+        hi = min(lo + FENCE_STRIDE, self.count)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, key):
+        offsets = []
+        i = self._lower_bound(key)
+        while i < self.count:
+            record_key, offset = RECORD.unpack_from(self.mm, self.at + i * RECORD.size)
+            if record_key != key:
+                break
+            offsets.append(offset)
+            i += 1
+        return offsets
+
+
+class PositionIndex:
+    '''Consulta um índice gerado por build_index.
+    '''
+    def __init__(self, index_path):
+        self._file = open(index_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_pos, n_mat, pos_at, mat_at, fences_pos_at, fences_mat_at = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Arquivo de índice inválido: {index_path}")
+        self.positions = _Section(self._mm, pos_at, n_pos, fences_pos_at)
+        self.materials = _Section(self._mm, mat_at, n_mat, fences_mat_at)
+
+    def games_with_position(self, position_hash):
+        '''Deslocamentos das partidas que alcançaram a posição (ver Game.position_hash).
+        '''
+        return self.positions.lookup(position_hash)
+
+    def games_reaching(self, game):
+        '''Deslocamentos das partidas que alcançaram a posição atual de game.
+        '''
+        return self.games_with_position(game.position_hash())
+
+    def games_with_material(self, material):
+        '''Deslocamentos das partidas com a assinatura de material indicada,
+        dada como chave inteira ou como texto (ex.: "KRPkr").
+        '''
+        if isinstance(material, str):
+            material = material_key_from_string(material)
+        return self.materials.lookup(material)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Índice de posições para arquivos de partidas.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Indexa um arquivo de partidas.")
+    build.add_argument('archive')
+    build.add_argument('index')
+    build.add_argument('--workers', type=int, default=None)
+
+    query = sub.add_parser('query', help="Consulta um índice.")
+    query.add_argument('index')
+    query.add_argument('--archive', help="Arquivo de origem, para mostrar as partidas encontradas.")
+    group = query.add_mutually_exclusive_group(required=True)
+    group.add_argument('--moves', help="Lances até a posição procurada (ex.: \"e2e4 e7e5\").")
+    group.add_argument('--material', help="Assinatura de material (ex.: KRPkr).")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        n_pos, n_mat = build_index(args.archive, args.index, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{n_pos} registros de posição e {n_mat} de material indexados em {elapsed:.1f}s")
+        return 0
+
+    game = None
+    material = None
+    try:
+        if args.moves is not None:
+            moves = parse_game_line(args.moves)
+            for played, game in enumerate(replay(moves)):
+                pass
+            # replay para no primeiro lance inválido: a posição alcançada não é a pedida
+            if played < len(moves):
+                parser.error(f"lance ilegal em --moves: {format_move(*moves[played])}")
+        else:
+            material = material_key_from_string(args.material)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    with PositionIndex(args.index) as index:
+        start = time.perf_counter()
+        if game is not None:
+            offsets = index.games_reaching(game)
+        else:
+            offsets = index.games_with_material(material)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{len(offsets)} partidas encontradas em {elapsed_ms:.2f} ms")
+        for offset in offsets:
+            if args.archive:
+                moves = read_game_at(args.archive, offset)
+                print(offset, len(moves), "lances")
+            else:
+                print(offset)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
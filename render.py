@@ -0,0 +1,168 @@
+'''Geração em lote de diagramas de posições (PNG), sem janela.
+
+Usa o driver de vídeo "dummy" do SDL e o mesmo desenho da interface
+(ChessGUI.draw_board e ChessGUI.draw_pieces). Cada processo do pool carrega a
+imagem das peças uma vez, mantém as peças redimensionadas em cache por tamanho
+(gui.piece_sprites) e desenha o tabuleiro vazio uma única vez por tamanho; cada
+diagrama é só uma cópia desse fundo mais as peças.
+
+A entrada tem uma posição por linha. O primeiro campo separado por ';' é a FEN,
+então a saída de tactics.py pode ser usada diretamente. Os arquivos são gravados
+em <saída>/<tamanho>/<chave>.png, com a chave Zobrist da posição em hexadecimal.
+Assim o nome é estável entre execuções e posições repetidas geram uma só imagem.
+
+Uso:
+    python render.py problemas.txt diagramas/ --sizes 64 128 256 --workers 8
+'''
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+# Sem os tratadores de sinal do SDL, para que Pool.terminate encerre os processos
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import argparse
+import sys
+
+import pygame
+
+from batch import BatchStats, open_input, worker_pool, worker_state
+from game import Game
+from gui import ChessGUI, piece_sprites
+
+DEFAULT_SIZES = (64, 128, 256)
+BATCH_SIZE = 64  # posições por tarefa do pool
+
+
+class DiagramRenderer(ChessGUI):
+    '''Desenha posições numa superfície fora da tela, com o tamanho do
+    tabuleiro em pixels arredondado para baixo a um múltiplo de 8.
+    '''
+    def __init__(self, size):
+        self.SQUARE_SIZE = size // 8
+        self.BOARD_SIZE = self.SQUARE_SIZE * 8
+        self.piece_images = piece_sprites(self.SQUARE_SIZE)
+        self.game = None
+
+        # Fundo pré-desenhado com o próprio draw_board
+        self.background = pygame.Surface((self.BOARD_SIZE, self.BOARD_SIZE))
+        self.screen = self.background
+        self.draw_board()
+        self.screen = pygame.Surface((self.BOARD_SIZE, self.BOARD_SIZE))
+
+    def render(self, game):
+        '''Desenha a posição do jogo e devolve a superfície (reaproveitada a
+        cada chamada).
+        '''
+        self.game = game
+        self.screen.blit(self.background, (0, 0))
+        self.draw_pieces()
+        return self.screen
+
+
+def position_fen(line):
+    '''FEN da linha de entrada, ou None para linhas vazias.
+    '''
+    fen = line.split(';', 1)[0].strip()
+    return fen or None
+
+
+def _make_renderers(sizes):
+    # Executado uma vez em cada processo do pool
+    pygame.display.init()
+    # convert() da imagem das peças precisa de um modo de vídeo definido
+    pygame.display.set_mode((1, 1))
+    return [DiagramRenderer(size) for size in sizes]
+
+
+def _render_batch(task):
+    '''Grava os diagramas de um lote de FENs em todos os tamanhos e devolve
+    (gravados, erros).
+    '''
+    fens, output_dir = task
+    written = 0
+    errors = []
+    for fen in fens:
+        try:
+            game = Game(fen)
+        except ValueError as e:
+            errors.append(str(e))
+            continue
+        name = f"{game.position_hash():016x}.png"
+        for renderer in worker_state():
+            path = os.path.join(output_dir, str(renderer.BOARD_SIZE), name)
+            pygame.image.save(renderer.render(game), path)
+            written += 1
+    return written, errors
+
+
+class RenderStats(BatchStats):
+    '''Contadores da geração.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.positions = 0
+        self.images = 0
+        self.errors = 0
+
+    def __str__(self):
+        return (f"{self.positions} posições, {self.images} imagens ({self.rate(self.images):.0f}/s), "
+                f"{self.errors} erros em {self.elapsed:.1f}s")
+
+
+def _batches(fens, batch_size):
+    # Agrupa as FENs (sem repetições) em lotes, para reduzir a comunicação com o pool
+    seen = set()
+    batch = []
+    for fen in fens:
+        key = ' '.join(fen.split()[:2])
+        if key in seen:
+            continue
+        seen.add(key)
+        batch.append(fen)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def render_diagrams(fens, output_dir, sizes=DEFAULT_SIZES, workers=None, batch_size=BATCH_SIZE, stats=None):
+    '''Gera os diagramas das FENs em output_dir, um subdiretório por tamanho.
+    '''
+    stats = stats if stats is not None else RenderStats()
+    sizes = sorted({size // 8 * 8 for size in sizes})
+    for size in sizes:
+        os.makedirs(os.path.join(output_dir, str(size)), exist_ok=True)
+
+    tasks = ((batch, output_dir) for batch in _batches(fens, batch_size))
+    with worker_pool(workers, _make_renderers, (sizes,)) as pool:
+        for written, errors in pool.imap_unordered(_render_batch, tasks):
+            stats.images += written
+            stats.positions += written // len(sizes)
+            stats.errors += len(errors)
+            for error in errors:
+                print(error, file=sys.stderr)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera diagramas PNG de posições em lote.")
+    parser.add_argument('positions', help="Arquivo com uma FEN por linha ('-' para a entrada padrão).")
+    parser.add_argument('output_dir')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Tamanhos do tabuleiro em pixels (arredondados para múltiplos de 8).")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    if min(args.sizes) < 8:
+        parser.error("os tamanhos devem ter pelo menos 8 pixels")
+
+    with open_input(args.positions) as source:
+        fens = (fen for fen in map(position_fen, source) if fen)
+        stats = render_diagrams(fens, args.output_dir, args.sizes, workers=args.workers)
+    print(stats, file=sys.stderr)
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+'''Mineração de problemas táticos (mates forçados e ganhos de material) em
+arquivos de partidas.
+
+O processamento tem duas etapas, ambas num pool de processos:
+
+1. Filtro barato: cada trecho do arquivo (ver archive.split_archive) é
+   reproduzido e só sobrevivem as posições em que o lance jogado dá xeque ou
+   em que o lado a jogar ganha material nos lances seguintes. Os dois testes
+   usam apenas Board.is_in_check e Board.material_key, sem busca.
+2. Verificação cara: cada candidata é resolvida pela busca (engine.py). Um
+   mate forçado dentro da profundidade vira um problema de mate; um ganho de
+   material com um único lance vencedor vira um problema de tática.
+
+As submissões das duas etapas são limitadas por janelas, então o uso de
+memória não depende do tamanho do arquivo. A saída tem uma linha por
+problema: "FEN;solução;tema", com a solução em lances de coordenadas.
+
+Uso:
+    python tactics.py partidas.txt problemas.txt --workers 8
+'''
+
+import argparse
+import sys
+from collections import deque
+
+from archive import format_move, read_games, replay, split_archive
+from batch import BatchStats, open_output, pool_size, worker_pool, worker_state
+from board import MATERIAL_KEY_BITS, PIECE_KINDS
+from engine import MATE_SCORE, MATE_THRESHOLD, Search, make_search_move, other_color, unmake_search_move
+from evaluation import evaluate
+from game import Game
+from pieces import PIECE_VALUES
+
+CHUNK_SIZE = 1 << 18
+SWING_PLIES = 3  # lances à frente considerados no ganho de material
+SWING_THRESHOLD = 200  # centipeões ganhos para a posição ser candidata
+MATE_DEPTH = 3  # profundidade da busca de mate (mate em até 2)
+TACTIC_DEPTH = 3
+WIN_THRESHOLD = 200  # ganho mínimo sobre a avaliação estática
+UNIQUE_MARGIN = 150  # o segundo melhor lance tem de ser pelo menos isto pior
+
+# Valor de cada tipo de peça na ordem de PIECE_KINDS, com sinal (brancas positivas)
+_KIND_VALUES = [(PIECE_VALUES[symbol] if symbol != 'K' else 0) * (1 if color == 'white' else -1)
+                for color, symbol in PIECE_KINDS]
+_KIND_MASK = (1 << MATERIAL_KEY_BITS) - 1
+
+
+def material_balance(material_key):
+    '''Saldo material (brancas menos pretas) a partir de Board.material_key.
+    '''
+    balance = 0
+    for value in _KIND_VALUES:
+        balance += (material_key & _KIND_MASK) * value
+        material_key >>= MATERIAL_KEY_BITS
+    return balance
+
+
+def _filter_chunk(task):
+    '''Etapa 1: reproduz as partidas do trecho e devolve as posições candidatas
+    como (deslocamento, lance, fen), mais contadores.
+    '''
+    path, start, end, swing_plies, swing_threshold = task
+    candidates = []
+    games = positions = 0
+    for offset, moves in read_games(path, start, end):
+        games += 1
+        fens = []
+        balances = []
+        checks = []
+        for game in replay(moves):
+            fens.append(game.to_fen())
+            balances.append(material_balance(game.board.material_key))
+            checks.append(game.board.is_in_check(game.current_turn))
+        positions += len(fens)
+        for ply in range(len(fens) - 1):
+            sign = 1 if ply % 2 == 0 else -1
+            horizon = balances[ply + 1:ply + 1 + swing_plies]
+            gained = max((balance - balances[ply]) * sign for balance in horizon)
+            if checks[ply + 1] or gained >= swing_threshold:
+                candidates.append((offset, ply, fens[ply]))
+    return games, positions, candidates
+
+
+def _solve(task):
+    '''Etapa 2: verifica a candidata com a busca e devolve o problema como
+    (fen, solução, tema), ou None.
+    '''
+    candidate, mate_depth, tactic_depth, win_threshold, unique_margin = task
+    _, _, fen = candidate
+    game = Game(fen)
+    board, color = game.board, game.current_turn
+    # A tabela de transposição fica entre candidatas: as entradas são conferidas
+    # pela chave completa e search() já inicia uma nova geração (new_search)
+    search = worker_state()
+
+    score, best_move, _ = search.search(board, color, max_depth=mate_depth)
+    if best_move is None:
+        return None
+    if score >= MATE_THRESHOLD:
+        plies = MATE_SCORE - score
+        line = search.principal_variation(board, color, plies)
+        if len(line) != plies:
+            return None
+        return fen, ' '.join(format_move(*move) for move in line), f"mate{(plies + 1) // 2}"
+
+    root_moves = search.search_root_moves(board, color, tactic_depth)
+    best_score, best_move = root_moves[0]
+    if best_score - evaluate(board, color, search.pawn_cache) < win_threshold:
+        return None
+    if len(root_moves) > 1 and root_moves[1][0] > best_score - unique_margin:
+        return None
+    line = [best_move] + _continuation(search, board, color, best_move, tactic_depth - 1)
+    return fen, ' '.join(format_move(*move) for move in line), 'material'
+
+
+def _continuation(search, board, color, move, length):
+    # Linha principal depois do lance vencedor, a partir da tabela de transposição
+    captured = make_search_move(board, move)
+    try:
+        return search.principal_variation(board, other_color(color), length)
+    finally:
+        unmake_search_move(board, move, captured)
+
+
+class MiningStats(BatchStats):
+    '''Contadores das duas etapas.
+    '''
+    def __init__(self):
+        super().__init__()
+        self.games = 0
+        self.positions = 0
+        self.candidates = 0
+        self.puzzles = 0
+
+    def __str__(self):
+        kept = self.candidates / self.positions if self.positions else 0.0
+        return (f"{self.games} partidas ({self.rate(self.games):.1f}/s), {self.positions} posições, "
+                f"{self.candidates} candidatas ({kept:.1%}), {self.puzzles} problemas em {self.elapsed:.1f}s")
+
+
+def mine_tactics(archive_path, workers=None, chunk_size=CHUNK_SIZE, swing_plies=SWING_PLIES,
+                 swing_threshold=SWING_THRESHOLD, mate_depth=MATE_DEPTH, tactic_depth=TACTIC_DEPTH,
+                 win_threshold=WIN_THRESHOLD, unique_margin=UNIQUE_MARGIN, stats=None):
+    '''Gera (fen, solução, tema) para cada problema encontrado no arquivo.
+    A ordem de saída não segue a ordem das partidas.
+    '''
+    stats = stats if stats is not None else MiningStats()
+    chunks = iter(split_archive(archive_path, chunk_size))
+    filter_pending = deque()
+    solve_pending = deque()
+
+    with worker_pool(workers, Search) as pool:
+        processes = pool_size(workers)
+        filter_window = 2 * processes
+        solve_window = 32 * processes
+
+        def submit_filters():
+            while len(filter_pending) < filter_window:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                filter_pending.append(pool.apply_async(_filter_chunk, (chunk + (swing_plies, swing_threshold),)))
+
+        def collect(result):
+            puzzle = result.get()
+            if puzzle is not None:
+                stats.puzzles += 1
+            return puzzle
+
+        submit_filters()
+        while filter_pending or solve_pending:
+            # Entrega as verificações prontas (ou espera se a janela encheu)
+            while solve_pending and (solve_pending[0].ready() or len(solve_pending) >= solve_window):
+                puzzle = collect(solve_pending.popleft())
+                if puzzle is not None:
+                    yield puzzle
+            if filter_pending:
+                games, positions, candidates = filter_pending.popleft().get()
+                stats.games += games
+                stats.positions += positions
+                stats.candidates += len(candidates)
+                for candidate in candidates:
+                    solve_pending.append(pool.apply_async(
+                        _solve, ((candidate, mate_depth, tactic_depth, win_threshold, unique_margin),)))
+                submit_filters()
+            elif solve_pending:
+                puzzle = collect(solve_pending.popleft())
+                if puzzle is not None:
+                    yield puzzle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minera problemas táticos em arquivos de partidas.")
+    parser.add_argument('archive')
+    parser.add_argument('output', help="Arquivo de saída ('-' para a saída padrão).")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--mate-depth', type=int, default=MATE_DEPTH)
+    parser.add_argument('--swing', type=int, default=SWING_THRESHOLD,
+                        help="Ganho de material, em centipeões, para a posição ser candidata.")
+    args = parser.parse_args(argv)
+
+    stats = MiningStats()
+    with open_output(args.output) as out:
+        for fen, solution, theme in mine_tactics(args.archive, workers=args.workers,
+                                                 mate_depth=args.mate_depth,
+                                                 swing_threshold=args.swing, stats=stats):
+            out.write(f"{fen};{solution};{theme}\n")
+            out.flush()
+    print(stats, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())